@@ -5,7 +5,8 @@ from src.logica.LogicaRecetario import LogicaRecetario
 if __name__ == '__main__':
     # Punto inicial de la aplicación
 
-    logica = LogicaRecetario()
+    # Las importaciones y las listas usan los perfiles de SQLite de declarative_base.PERFILES:
+    logica = LogicaRecetario(perfiles={'importar': 'escritura', 'listar': 'lectura'})
 
     app = App_Recetario(sys.argv, logica)
     sys.exit(app.exec_())
\ No newline at end of file
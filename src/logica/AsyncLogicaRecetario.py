@@ -0,0 +1,111 @@
+'''
+Versión asíncrona (asyncio) de la lógica del recetario
+'''
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from src.logica.LogicaRecetario import LogicaRecetario
+
+
+def corrutina(nombre):
+    # Crea la versión asíncrona del método con ese nombre de LogicaRecetario:
+    metodo = getattr(LogicaRecetario, nombre)
+
+    @functools.wraps(metodo)
+    async def ejecutar(self, *args, **kwargs):
+        return await self.ejecutar(nombre, *args, **kwargs)
+
+    return ejecutar
+
+
+class AsyncLogicaRecetario:
+    '''
+    Expone los métodos de LogicaRecetario como corrutinas. Cada llamado se ejecuta en un grupo acotado de hilos y
+    cada hilo usa su propia sesión de la base de datos, por lo que varias consultas independientes se pueden hacer al
+    mismo tiempo y esperar juntas con asyncio.gather.
+    '''
+
+    def __init__(self, logica=None, max_hilos=4):
+        ''' Constructor
+        Parámetros:
+            logica (LogicaRecetario): La lógica que se ejecuta en los hilos. Si es None se crea una nueva
+            max_hilos (int): La cantidad máxima de llamados que se ejecutan al mismo tiempo
+        '''
+        self.logica = logica if logica is not None else LogicaRecetario()
+        self.ejecutor = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix='recetario')
+
+    async def ejecutar(self, nombre, *args, **kwargs):
+        ''' Ejecuta un método de la lógica en el grupo de hilos
+        Parámetros:
+            nombre (string): El nombre del método de LogicaRecetario
+        Retorna:
+            Lo que retorne el método
+        '''
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.ejecutor, functools.partial(self.en_hilo, nombre, *args, **kwargs))
+
+    def en_hilo(self, nombre, *args, **kwargs):
+        try:
+            return getattr(self.logica, nombre)(*args, **kwargs)
+        finally:
+            # La sesión es del hilo y no del llamado, así que se libera para no dejar transacciones abiertas:
+            self.logica.cerrar_sesion()
+
+    def cerrar(self):
+        ''' Espera los llamados pendientes y termina los hilos. Bloquea el hilo que la llama, así que dentro de
+        una corrutina se usa cerrar_async
+        '''
+        self.ejecutor.shutdown(wait=True)
+
+    async def cerrar_async(self):
+        ''' Igual a cerrar, pero la espera se hace en otro hilo para no detener el loop de asyncio
+        '''
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.cerrar)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, tipo, valor, traza):
+        await self.cerrar_async()
+
+    # Listados:
+    dar_recetas = corrutina('dar_recetas')
+    dar_recetas_pagina = corrutina('dar_recetas_pagina')
+    dar_recetas_por_tiempo = corrutina('dar_recetas_por_tiempo')
+    dar_recetas_por_costo = corrutina('dar_recetas_por_costo')
+    dar_receta = corrutina('dar_receta')
+    dar_receta_por_id = corrutina('dar_receta_por_id')
+    dar_ingredientes = corrutina('dar_ingredientes')
+    dar_ingredientes_pagina = corrutina('dar_ingredientes_pagina')
+    dar_ingrediente = corrutina('dar_ingrediente')
+    dar_ingredientes_receta = corrutina('dar_ingredientes_receta')
+    dar_recetas_ingrediente = corrutina('dar_recetas_ingrediente')
+    contar_usos_ingrediente = corrutina('contar_usos_ingrediente')
+
+    # Creación, edición y eliminación:
+    validar_crear_editar_receta = corrutina('validar_crear_editar_receta')
+    crear_receta = corrutina('crear_receta')
+    editar_receta = corrutina('editar_receta')
+    guardar_receta = corrutina('guardar_receta')
+    eliminar_receta = corrutina('eliminar_receta')
+    validar_crear_editar_ingrediente = corrutina('validar_crear_editar_ingrediente')
+    crear_ingrediente = corrutina('crear_ingrediente')
+    editar_ingrediente = corrutina('editar_ingrediente')
+    guardar_ingrediente = corrutina('guardar_ingrediente')
+    eliminar_ingrediente = corrutina('eliminar_ingrediente')
+    validar_crear_editar_ingReceta = corrutina('validar_crear_editar_ingReceta')
+    agregar_ingrediente_receta = corrutina('agregar_ingrediente_receta')
+    editar_ingrediente_receta = corrutina('editar_ingrediente_receta')
+    eliminar_ingrediente_receta = corrutina('eliminar_ingrediente_receta')
+
+    # Preparación:
+    dar_preparacion = corrutina('dar_preparacion')
+    dar_preparaciones = corrutina('dar_preparaciones')
+    dar_lista_compras = corrutina('dar_lista_compras')
+
+    # Búsqueda:
+    buscar_recetas = corrutina('buscar_recetas')
+    completar_ingredientes = corrutina('completar_ingredientes')
+    dar_indice_ingredientes = corrutina('dar_indice_ingredientes')
@@ -9,7 +9,54 @@ class FachadaRecetario:
             (list): La lista con los objetos de recetas
         '''
         raise NotImplementedError("Método no implementado")
+
+    def dar_recetas_pagina(self, tamano_pagina, cursor=None):
+        ''' Retorna una página de la lista de recetas ordenada por nombre
+        Parámetros:
+            tamano_pagina (int): La cantidad máxima de recetas de la página (mayor que cero)
+            cursor (tuple): El cursor retornado con la página anterior o None para la primera página
+        Retorna:
+            (list): Las recetas de la página
+            (tuple): El cursor de la página siguiente o None si es la última página
+        '''
+        raise NotImplementedError("Método no implementado")
     
+    def cerrar_sesion(self):
+        ''' Libera los recursos que la lógica tenga abiertos para el hilo actual. La interfaz la llama al terminar
+        cada llamado hecho en un hilo de trabajo. Por defecto no hace nada
+        '''
+        pass
+
+    def buscar_recetas(self, texto, limite=20):
+        ''' Busca recetas por las palabras de su nombre o de su preparación
+        Parámetros:
+            texto (string): Las palabras a buscar. Cada palabra puede ser el comienzo de una palabra de la receta
+            limite (int): La cantidad máxima de recetas a retornar
+        Retorna:
+            (list): Las recetas encontradas, de la más relevante a la menos relevante
+        '''
+        raise NotImplementedError("Método no implementado")
+
+    def dar_recetas_por_tiempo(self, tiempo_maximo):
+        ''' Retorna las recetas que se preparan en un tiempo máximo
+        Parámetros:
+            tiempo_maximo (string): El tiempo máximo de preparación con el formato HH:MM:SS. Con otro formato se
+            lanza ValueError
+        Retorna:
+            (list): Las recetas, de la de menor tiempo de preparación a la de mayor
+        '''
+        raise NotImplementedError("Método no implementado")
+
+    def dar_recetas_por_costo(self, descendente=False, limite=None):
+        ''' Retorna las recetas ordenadas por el costo de sus ingredientes para el número de personas de la receta
+        Parámetros:
+            descendente (bool): Si es True se retornan de la más costosa a la menos costosa
+            limite (int): La cantidad máxima de recetas a retornar. None las retorna todas
+        Retorna:
+            (list): Las recetas, cada una con su costo en el campo costo_base
+        '''
+        raise NotImplementedError("Método no implementado")
+
     def dar_receta(self, id_receta):
         ''' Retorna una receta a partir de su identificador
         Parámetros:
@@ -18,6 +65,24 @@ class FachadaRecetario:
             (dict): La receta identificada con el id_receta recibido como parámetro
         '''
         raise NotImplementedError("Método no implementado")
+
+    def dar_receta_por_id(self, id_bd):
+        ''' Retorna una receta a partir de su identificador en la base de datos
+        Parámetros:
+            id_bd (int): El identificador de la receta en la base de datos
+        Retorna:
+            (dict): La receta con el id_bd recibido como parámetro o None si no existe
+        '''
+        raise NotImplementedError("Método no implementado")
+
+    def dar_id_receta(self, id_receta):
+        ''' Retorna el identificador en la base de datos de una receta de la lista ordenada
+        Parámetros:
+            id_receta (int): La posición de la receta en la lista retornada por dar_recetas
+        Retorna:
+            (int): El identificador de la receta en la base de datos
+        '''
+        raise NotImplementedError("Método no implementado")
     
 
     def validar_crear_editar_receta(self, id_receta, receta, tiempo, personas, calorias, preparacion, modo):
@@ -56,10 +121,26 @@ class FachadaRecetario:
         '''
         raise NotImplementedError("Método no implementado")
 
+    def guardar_receta(self, id_receta, receta, tiempo, personas, calorias, preparacion):
+        ''' Valida una receta y, si es válida, la crea o guarda sus cambios
+        Parámetros:
+            id_receta (int): El identificador de la receta a editar, -1 para crear una receta nueva
+            receta (string): El nombre de la receta
+            tiempo (string): El tiempo de preparación de la receta
+            personas (string): La cantidad de personas de la receta
+            calorias (string): Calorías por porción
+            preparación (string): Proceso de preparación de la receta
+        Retorna:
+            (string): El mensaje de error de la validación, vacío si la receta se guardó
+        '''
+        raise NotImplementedError("Método no implementado")
+
     def eliminar_receta(self, id_receta):
         ''' Elimina una receta de la lista de recetas
         Parámetros:
             id_receta (int): El identificador de la receta que se desea eliminar
+        Retorna:
+            (bool): True si la receta se eliminó junto con sus ingredientes
         '''
         raise NotImplementedError("Método no implementado")
     
@@ -70,7 +151,36 @@ class FachadaRecetario:
             (list): La lista con los dict o los objetos de los ingredientes
         '''
         raise NotImplementedError("Método no implementado")
+
+    def dar_ingredientes_pagina(self, tamano_pagina, cursor=None):
+        ''' Retorna una página de la lista de ingredientes ordenada por nombre, unidad y sitio de compra
+        Parámetros:
+            tamano_pagina (int): La cantidad máxima de ingredientes de la página (mayor que cero)
+            cursor (tuple): El cursor retornado con la página anterior o None para la primera página
+        Retorna:
+            (list): Los ingredientes de la página
+            (tuple): El cursor de la página siguiente o None si es la última página
+        '''
+        raise NotImplementedError("Método no implementado")
     
+    def completar_ingredientes(self, prefijo, limite=10, aproximado=True):
+        ''' Retorna los ingredientes con alguna palabra del nombre que empieza por el prefijo
+        Parámetros:
+            prefijo (string): El texto escrito por el usuario (no distingue mayúsculas ni tildes)
+            limite (int): La cantidad máxima de ingredientes a retornar
+            aproximado (bool): Si es True también se aceptan prefijos con un error de digitación
+        Retorna:
+            (list): Pares (posición en dar_ingredientes, ingrediente)
+        '''
+        raise NotImplementedError("Método no implementado")
+
+    def dar_indice_ingredientes(self):
+        ''' Retorna el índice en memoria que usa completar_ingredientes, para consultarlo sin volver a la lógica
+        Retorna:
+            (IndiceIngredientes): El índice y la lista de ingredientes con la que se construyó
+        '''
+        raise NotImplementedError("Método no implementado")
+
     def dar_ingrediente(self, id_ingrediente):
         ''' Retorna un ingrediente dado su id
         Retorna:
@@ -109,6 +219,24 @@ class FachadaRecetario:
             id_ingrediente (int): El identificador del ingrediente que se desea eliminar
         '''
         raise NotImplementedError("Método no implementado")
+
+    def dar_recetas_ingrediente(self, id_ingrediente):
+        ''' Retorna las recetas en las que se usa un ingrediente
+        Parámetros:
+            id_ingrediente (int): El identificador del ingrediente
+        Retorna:
+            (list): Diccionarios con el id y el nombre de cada receta y la cantidad del ingrediente en ella
+        '''
+        raise NotImplementedError("Método no implementado")
+
+    def contar_usos_ingrediente(self, id_ingrediente):
+        ''' Retorna el número de recetas en las que se usa un ingrediente
+        Parámetros:
+            id_ingrediente (int): El identificador del ingrediente
+        Retorna:
+            (int): El número de recetas
+        '''
+        raise NotImplementedError("Método no implementado")
     
     def dar_ingredientes_receta(self, id_receta):
         ''' Retorna el listado de ingredientes de una receta dado si id
@@ -151,6 +279,8 @@ class FachadaRecetario:
         Parámetros:
             id_ingrediente_receta (int): El identificador del ingrediente de la receta que se desea eliminar
             receta:receta a la que pertenece
+        Retorna:
+            (bool): True si el ingrediente se eliminó de la receta
         '''
         raise NotImplementedError("Método no implementado")
 		
@@ -164,6 +294,26 @@ class FachadaRecetario:
                   (list) ingredientes de la receta 
         '''
 
+    def dar_preparaciones(self, id_receta, cantidades_personas):
+        ''' retorna los datos de preparación de una receta para cada una de las cantidades de personas
+        Parámetros:
+            id_receta: identificador de la receta que se va a preparar
+            cantidades_personas (list): cantidades de personas para las que se va a preparar la receta
+        Retorna:
+            (list) la preparación de cada cantidad de personas, igual a la que retorna dar_preparacion
+        '''
+        raise NotImplementedError("Método no implementado")
+
+    def dar_lista_compras(self, menu):
+        ''' retorna la lista de compras consolidada para preparar varias recetas
+        Parámetros:
+            menu (list): pares (id_receta, cantidad_personas) con las recetas que se van a preparar
+        Retorna:
+            (list) un diccionario por sitio de compra con los ingredientes (nombre, unidad, cantidad total y valor)
+                   que se deben comprar allí y el costo del sitio
+        '''
+        raise NotImplementedError("Método no implementado")
+
     def crear_ingrediente(self, nombre, unidad, valor, sitioCompra):
         ''' Crea un nuevo ingrediente
             Parámetros:
@@ -174,3 +324,79 @@ class FachadaRecetario:
         '''
         raise NotImplementedError("Método no implementado")
 
+    def guardar_ingrediente(self, id_ingrediente, nombre, unidad, valor, sitioCompra):
+        ''' Valida un ingrediente y, si es válido, lo crea o guarda sus cambios
+        Parámetros:
+            id_ingrediente (int): El identificador del ingrediente a editar, -1 para crear un ingrediente nuevo
+            nombre (string): El nombre del ingrediente
+            unidad (string): Unidad
+            valor (string): Valor del ingrediente para la unidad
+            sitioCompra (string): lugar en el que se compra el ingrediente
+        Retorna:
+            (string): El mensaje de error de la validación, vacío si el ingrediente se guardó
+        '''
+        raise NotImplementedError("Método no implementado")
+
+    def validar_recetas(self, recetas):
+        ''' Valida muchas recetas a la vez con las mismas reglas de validar_crear_editar_receta
+        Parámetros:
+            recetas (list): Diccionarios con nombre, tiempo, personas, calorias y preparacion. Si tienen id_receta
+            se validan como edición de esa receta
+        Retorna:
+            (list): El mensaje de error de cada receta, en el mismo orden. "" si la receta es válida
+        '''
+        raise NotImplementedError("Método no implementado")
+
+    def validar_ingredientes(self, ingredientes):
+        ''' Valida muchos ingredientes a la vez con las mismas reglas de validar_crear_editar_ingrediente
+        Parámetros:
+            ingredientes (list): Diccionarios con nombre, unidad, valor y sitioCompra. Si tienen id_ingrediente
+            (posición en la lista de ingredientes) se validan como edición de ese ingrediente
+        Retorna:
+            (list): El mensaje de error de cada ingrediente, en el mismo orden. "" si el ingrediente es válido
+        '''
+        raise NotImplementedError("Método no implementado")
+
+    def validar_ingredientes_receta(self, ingredientes_receta):
+        ''' Valida muchos ingredientes de recetas a la vez con las mismas reglas de validar_crear_editar_ingReceta
+        Parámetros:
+            ingredientes_receta (list): Diccionarios con receta (nombre), ingrediente (nombre), unidad y cantidad
+        Retorna:
+            (list): El mensaje de error de cada fila, en el mismo orden. "" si la fila es válida
+        '''
+        raise NotImplementedError("Método no implementado")
+
+    def importar_ingredientes_csv(self, archivo, tamano_lote=1000):
+        ''' Importa ingredientes desde un archivo CSV con las columnas nombre, unidad, valor y sitioCompra
+        Parámetros:
+            archivo (string o archivo): La ruta del archivo o un archivo abierto en modo texto
+            tamano_lote (int): La cantidad de filas que se validan e insertan en cada commit
+        Retorna:
+            (dict): La cantidad de ingredientes importados y la lista de filas rechazadas con su
+            número de línea y mensaje de error
+        '''
+        raise NotImplementedError("Método no implementado")
+
+    def importar_recetas_csv(self, archivo, tamano_lote=1000):
+        ''' Importa recetas desde un archivo CSV con las columnas nombre, tiempo, personas, calorias y preparacion
+        Parámetros:
+            archivo (string o archivo): La ruta del archivo o un archivo abierto en modo texto
+            tamano_lote (int): La cantidad de filas que se validan e insertan en cada commit
+        Retorna:
+            (dict): La cantidad de recetas importadas y la lista de filas rechazadas con su
+            número de línea y mensaje de error
+        '''
+        raise NotImplementedError("Método no implementado")
+
+    def exportar_catalogo(self, directorio, formato="csv", anidado=None, tamano_lote=1000):
+        ''' Exporta las recetas, los ingredientes y los ingredientes de cada receta sin cargar todo el catálogo en memoria
+        Parámetros:
+            directorio (string): La carpeta donde se crean los archivos recetas, ingredientes e ingredientes_receta
+            formato (string): "csv" o "jsonl"
+            anidado (bool): Solo para "jsonl". Si es True los ingredientes van dentro de cada receta en lugar de ir en
+            un archivo aparte. Por defecto es True para "jsonl"
+            tamano_lote (int): La cantidad de filas que se traen de la base de datos a la vez
+        Retorna:
+            (dict): La cantidad de filas escritas en cada archivo
+        '''
+        raise NotImplementedError("Método no implementado")
@@ -0,0 +1,115 @@
+'''
+Índice en memoria para autocompletar ingredientes por nombre
+'''
+import unicodedata
+from bisect import bisect_left
+
+
+def normalizar(texto):
+    # Minúsculas y sin tildes, para que "azucar" encuentre "Azúcar":
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(caracter for caracter in texto if not unicodedata.combining(caracter))
+
+
+def ediciones(texto, alfabeto):
+    # Todos los textos a una letra cambiada, sobrante, faltante o intercambiada de distancia:
+    divisiones = [(texto[:i], texto[i:]) for i in range(len(texto) + 1)]
+    borrados = [izquierda + derecha[1:] for izquierda, derecha in divisiones if derecha]
+    intercambios = [izquierda + derecha[1] + derecha[0] + derecha[2:] for izquierda, derecha in divisiones
+                    if len(derecha) > 1]
+    cambios = [izquierda + letra + derecha[1:] for izquierda, derecha in divisiones if derecha for letra in alfabeto]
+    inserciones = [izquierda + letra + derecha for izquierda, derecha in divisiones for letra in alfabeto]
+    return set(borrados + intercambios + cambios + inserciones)
+
+
+class IndiceIngredientes:
+    '''
+    Índice de prefijos sobre los nombres de los ingredientes. Guarda cada palabra del nombre en un arreglo
+    ordenado, de modo que buscar un prefijo es una búsqueda binaria más el recorrido de los resultados.
+    '''
+
+    def __init__(self, ingredientes):
+        ''' Construye el índice
+        Parámetros:
+            ingredientes (list): Los ingredientes en el orden de dar_ingredientes
+        '''
+        self.ingredientes = ingredientes
+        claves = []
+        for posicion, ingrediente in enumerate(ingredientes):
+            nombre = normalizar(ingrediente['nombre'])
+            # El nombre completo y cada una de sus palabras, para encontrar "criolla" en "Papa criolla":
+            palabras = nombre.split()
+            claves.append((nombre, posicion))
+            for k in range(1, len(palabras)):
+                claves.append((' '.join(palabras[k:]), posicion))
+        claves.sort()
+        self.claves = [clave for clave, posicion in claves]
+        self.posiciones = [posicion for clave, posicion in claves]
+        self.alfabeto = ''.join(sorted(set(''.join(self.claves))))
+
+    def completar(self, prefijo, limite=10):
+        ''' Retorna las posiciones de los ingredientes que tienen una palabra que empieza por el prefijo
+        Parámetros:
+            prefijo (string): El texto escrito por el usuario
+            limite (int): La cantidad máxima de resultados
+        Retorna:
+            (list): Las posiciones de los ingredientes en el orden de dar_ingredientes
+        '''
+        prefijo = normalizar(prefijo).strip()
+        if prefijo == '':
+            return []
+        encontrados = set()
+        i = bisect_left(self.claves, prefijo)
+        while i < len(self.claves) and self.claves[i].startswith(prefijo) and len(encontrados) < limite:
+            encontrados.add(self.posiciones[i])
+            i += 1
+        return sorted(encontrados)
+
+    def completar_aproximado(self, prefijo, limite=10, errores=1):
+        ''' Igual a completar, pero si no hay suficientes resultados también acepta prefijos con errores de digitación
+        Parámetros:
+            prefijo (string): El texto escrito por el usuario
+            limite (int): La cantidad máxima de resultados
+            errores (int): La cantidad máxima de letras cambiadas, sobrantes, faltantes o intercambiadas
+        Retorna:
+            (list): Las posiciones de los ingredientes, primero las que coinciden exactamente con el prefijo
+        '''
+        posiciones = self.completar(prefijo, limite)
+        prefijo = normalizar(prefijo).strip()
+        # Con prefijos muy cortos casi todo estaría a un error de distancia:
+        if len(posiciones) >= limite or len(prefijo) <= errores + 1:
+            return posiciones
+        # En lugar de comparar el prefijo con todos los nombres se generan sus variantes con errores y cada una se
+        # busca en el arreglo ordenado, de la más cercana a la más lejana:
+        encontrados = set(posiciones)
+        vistos = {prefijo}
+        variantes = [prefijo]
+        for distancia in range(errores):
+            siguientes = set()
+            for variante in variantes:
+                siguientes.update(ediciones(variante, self.alfabeto))
+            variantes = sorted(siguientes - vistos)
+            vistos.update(variantes)
+            for variante in variantes:
+                for posicion in self.completar(variante, limite):
+                    if posicion not in encontrados:
+                        encontrados.add(posicion)
+                        posiciones.append(posicion)
+                        if len(posiciones) >= limite:
+                            return posiciones
+        return posiciones
+
+    def sugerir(self, prefijo, limite=10, aproximado=True):
+        ''' Retorna los ingredientes sugeridos para el texto escrito
+        Parámetros:
+            prefijo (string): El texto escrito por el usuario
+            limite (int): La cantidad máxima de resultados
+            aproximado (bool): Si también se aceptan errores de digitación
+        Retorna:
+            (list): Parejas (posición, ingrediente) con las posiciones de la lista del índice
+        '''
+        if aproximado:
+            posiciones = self.completar_aproximado(prefijo, limite)
+        else:
+            posiciones = self.completar(prefijo, limite)
+        return [(posicion, self.ingredientes[posicion]) for posicion in posiciones]
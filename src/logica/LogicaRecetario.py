@@ -1,16 +1,97 @@
 '''
 Esta clase es tan sólo un mock con datos para probar la interfaz
 '''
+import copy
+import csv
+import functools
+import itertools
+import json
+import logging
 import math
+import os
 from src.logica.FachadaRecetario import FachadaRecetario
+from src.logica.IndiceIngredientes import IndiceIngredientes
 from src.modelo.ingrediente import Ingrediente
 from src.modelo.ingrediente import IngredienteReceta
-from src.modelo.receta import Receta
-from src.modelo.declarative_base import engine, Base, session
+from src.modelo.receta import Receta, formatear_tiempo, segundos_de_tiempo
+from src.modelo.registros import RegistroReceta, RegistroRecetaCosto, RegistroIngrediente, RegistroIngredienteReceta
+from src.modelo.declarative_base import engine, Base, session, transaccion, crear_motor, sesion_con_motor
+from src.modelo.migraciones import migrar_esquema
 from sqlalchemy import asc
 from sqlalchemy import desc
 import re
+import threading
 from sqlalchemy import and_
+from sqlalchemy import or_
+from sqlalchemy import column, literal_column, table
+from sqlalchemy import exists, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import aliased
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
+
+
+def despues_de(columnas, valores):
+    # Condicion (c1, c2, ...) > (v1, v2, ...) para paginar por llave (keyset) sobre el orden de las columnas:
+    condiciones = []
+    for i in range(len(columnas)):
+        iguales = [columnas[j] == valores[j] for j in range(i)]
+        condiciones.append(and_(*iguales, columnas[i] > valores[i]))
+    return or_(*condiciones)
+
+
+# Formato del tiempo de las recetas, "HH:MM:SS":
+PATRON_TIEMPO = re.compile(r'^\d{2}:\d{2}:\d{2}$')
+
+# Tabla virtual FTS5 de las recetas (se crea en migrar_esquema):
+receta_fts = table('receta_fts', column('rowid'), column('rank'))
+
+
+def consulta_fts(texto):
+    # Cada palabra se busca como prefijo y entre comillas para que los caracteres especiales de FTS5 no se
+    # interpreten como operadores:
+    return " ".join('"{}"*'.format(palabra.replace('"', '""')) for palabra in texto.split())
+
+
+def leer_lotes_csv(archivo, tamano_lote):
+    # Lee un CSV con encabezado sin cargarlo completo. Retorna lotes de (numero de linea, fila):
+    if isinstance(archivo, str):
+        with open(archivo, newline='', encoding='utf-8') as archivo_abierto:
+            yield from leer_lotes_csv(archivo_abierto, tamano_lote)
+        return
+    lector = csv.DictReader(archivo)
+    lote = []
+    for fila in lector:
+        lote.append((lector.line_num, {campo: valor if valor is not None else "" for campo, valor in fila.items()}))
+        if len(lote) == tamano_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+registro = logging.getLogger(__name__)
+
+
+def con_perfil(trabajo):
+    # Decorador: el metodo usa la sesion del perfil de SQLite configurado para ese tipo de trabajo (ver usar_perfil):
+    def decorador(metodo):
+        @functools.wraps(metodo)
+        def ejecutar(self, *args, **kwargs):
+            with self.usar_perfil(trabajo):
+                return metodo(self, *args, **kwargs)
+
+        return ejecutar
+
+    return decorador
+
+
+def bloques(valores, tamano=500):
+    # Parte los valores de un IN en bloques, porque SQLite limita la cantidad de parametros de una consulta:
+    valores = list(valores)
+    for i in range(0, len(valores), tamano):
+        yield valores[i:i + tamano]
 
 
 class LogicaRecetario(FachadaRecetario):
@@ -18,33 +99,228 @@ class LogicaRecetario(FachadaRecetario):
 
     EVENTO_EDITAR_RECETA = 1
 
-    def __init__(self):
+    # Cantidad de preparaciones (receta, personas) que se recuerdan:
+    TAMANO_MEMO_PREPARACIONES = 256
+
+    def __init__(self, perfiles=None):
         Base.metadata.create_all(engine)
+        # Indices unicos que no se pudieron crear porque la base de datos tiene datos repetidos. Sin ellos la
+        # aplicacion funciona, pero las validaciones de nombres repetidos no tienen el respaldo de la base de datos:
+        self.indices_pendientes = migrar_esquema(engine)
+        if self.indices_pendientes:
+            registro.warning("No se crearon los indices unicos %s porque hay datos repetidos",
+                             ", ".join(self.indices_pendientes))
+        # Perfil de SQLite (un nombre de PERFILES o un diccionario de PRAGMAs) para cada tipo de trabajo: 'importar'
+        # para las cargas de CSV y 'listar' para las listas y las exportaciones. Cada perfil tiene su propio motor
+        # sobre la misma base de datos; los trabajos sin perfil usan el motor del modulo:
+        self.perfiles = dict(perfiles or {})
+        self.motores = {}
+        self.trabajo_hilo = threading.local()
+        # Ids de la base de datos de las recetas en el orden de dar_recetas (se construye bajo demanda):
+        self.ids_recetas = None
+        # Cache de las listas ordenadas de recetas e ingredientes. Se borra con cada escritura que las cambia y la
+        # version evita guardar una lista que se leyo mientras otro hilo escribia:
+        self.cache_recetas = None
+        self.version_recetas = 0
+        self.cache_ingredientes = None
+        self.version_ingredientes = 0
+        self.indice_ingredientes = None
+        self.estadisticas_cache = {'aciertos': 0, 'fallos': 0}
+        # Protege las versiones, las listas guardadas y las estadisticas: comparar la version y guardar la lista
+        # debe ser una sola operacion para que un hilo que escribe no quede en medio:
+        self.candado_cache = threading.Lock()
+        # Preparaciones ya calculadas por (id de la receta, personas, version de los datos), de la menos a la mas
+        # recientemente usada:
+        self.memo_preparaciones = OrderedDict()
+        self.version_preparaciones = 0
+        self.candado_preparaciones = threading.Lock()
 
     def dar_recetas(self):
+        with self.candado_cache:
+            recetas = self.cache_recetas
+            if recetas is not None:
+                self.estadisticas_cache['aciertos'] += 1
+                return list(recetas)
+            self.estadisticas_cache['fallos'] += 1
+            version = self.version_recetas
         # Equivale a poner en SQL: SELECT * FROM receta ORDER BY receta ASC:
-        recetas = [elem.__dict__ for elem in session.query(Receta).order_by(asc(Receta.nombre)).all()]
-        return recetas
+        with self.usar_perfil('listar'):
+            recetas = tuple(RegistroReceta(*fila) for fila in session.query(
+                *RegistroReceta.columnas(Receta)).order_by(asc(Receta.nombre)).all())
+        with self.candado_cache:
+            if version == self.version_recetas:
+                self.cache_recetas = recetas
+                self.ids_recetas = [receta.id for receta in recetas]
+        return list(recetas)
+
+    @con_perfil('listar')
+    def dar_recetas_pagina(self, tamano_pagina, cursor=None):
+        if tamano_pagina < 1:
+            raise ValueError("El tamaño de la página debe ser mayor que cero")
+        # Orden de dar_recetas con el id como desempate, para que el cursor sea una llave estable:
+        orden = [Receta.nombre, Receta.id]
+        consulta = session.query(*RegistroReceta.columnas(Receta))
+        if cursor is not None:
+            consulta = consulta.filter(despues_de(orden, cursor))
+        filas = consulta.order_by(*orden).limit(tamano_pagina + 1).all()
+        recetas = [RegistroReceta(*fila) for fila in filas[:tamano_pagina]]
+        siguiente = None
+        if len(filas) > tamano_pagina:
+            siguiente = (recetas[-1].nombre, recetas[-1].id)
+        return recetas, siguiente
+
+    def buscar_recetas(self, texto, limite=20):
+        # Busqueda por palabras en el nombre y la preparacion, de la receta mas relevante a la menos relevante:
+        consulta = consulta_fts(texto)
+        if consulta == "":
+            return []
+        try:
+            filas = session.query(*RegistroReceta.columnas(Receta)).join(
+                receta_fts, receta_fts.c.rowid == Receta.id).filter(
+                literal_column('receta_fts').op('MATCH')(consulta)).order_by(
+                receta_fts.c.rank).limit(limite).all()
+        except OperationalError:
+            # SQLite sin FTS5: se busca el texto completo en el nombre y la preparacion
+            session.rollback()
+            patron = "%" + texto + "%"
+            filas = session.query(*RegistroReceta.columnas(Receta)).filter(
+                or_(Receta.nombre.like(patron), Receta.preparacion.like(patron))).order_by(
+                asc(Receta.nombre)).limit(limite).all()
+        return [RegistroReceta(*fila) for fila in filas]
+
+    def dar_recetas_por_tiempo(self, tiempo_maximo):
+        # Recetas que se preparan en tiempo_maximo ("HH:MM:SS") o menos, de la mas rapida a la mas demorada. Usa el
+        # indice de tiempo_segundos en lugar de revisar el tiempo de cada receta:
+        if (not isinstance(tiempo_maximo, str)) or (not PATRON_TIEMPO.match(tiempo_maximo)):
+            raise ValueError("El tiempo máximo debe tener el formato HH:MM:SS")
+        filas = session.query(*RegistroReceta.columnas(Receta)).filter(
+            Receta.tiempo_segundos <= segundos_de_tiempo(tiempo_maximo)).order_by(
+            asc(Receta.tiempo_segundos), asc(Receta.nombre)).all()
+        return [RegistroReceta(*fila) for fila in filas]
+
+    def dar_recetas_por_costo(self, descendente=False, limite=None):
+        # costo_base lo mantienen los triggers de la base de datos, asi que ordenar por costo es leer su indice:
+        orden = desc if descendente else asc
+        consulta = session.query(*RegistroRecetaCosto.columnas(Receta)).order_by(
+            orden(Receta.costo_base), asc(Receta.nombre))
+        if limite is not None:
+            consulta = consulta.limit(limite)
+        return [RegistroRecetaCosto(*fila) for fila in consulta.all()]
 
     def dar_receta(self, id_receta):
-        # Es la lista de recetas ordenadas por nombre:
-        recetas = self.dar_recetas()
+        # Se traduce la posicion en la lista ordenada al id de la base de datos:
+        return self.dar_receta_por_id(self.dar_id_receta(id_receta))
+
+    def dar_receta_por_id(self, id_bd):
+        # Equivale a poner en SQL: SELECT * FROM receta WHERE id = ?:
+        fila = session.query(*RegistroReceta.columnas(Receta)).filter(Receta.id == id_bd).first()
+        if fila is None:
+            return None
+        return RegistroReceta(*fila)
+
+    def dar_ids_recetas(self):
+        # Mapa posicion -> id con el mismo orden de dar_recetas. Solo se consultan los ids:
+        with self.candado_cache:
+            ids_recetas = self.ids_recetas
+            version = self.version_recetas
+        if ids_recetas is None:
+            ids_recetas = [fila.id for fila in session.query(Receta.id).order_by(asc(Receta.nombre)).all()]
+            with self.candado_cache:
+                if version == self.version_recetas:
+                    self.ids_recetas = ids_recetas
+        return ids_recetas
+
+    def dar_id_receta(self, id_receta):
+        # Lectura: si la posicion no existe se usa la anterior, como lo ha hecho siempre la interfaz:
+        ids_recetas = self.dar_ids_recetas()
         try:
-            return recetas[id_receta]
+            return ids_recetas[id_receta]
         except:
-            return recetas[id_receta - 1]
+            return ids_recetas[id_receta - 1]
 
-    def validar_crear_editar_receta(self, id_receta, nombre, tiempo, personas, calorias, preparacion, modo):
-        mensaje_error = ""
-        # Expresión regular para el formato de hora "HH:MM:SS"
-        patron = r'^\d{2}:\d{2}:\d{2}$'
+    def dar_id_receta_escritura(self, id_receta):
+        # Escrituras: solo posiciones de la lista. Retorna None si la posicion no existe, para no editar ni borrar
+        # otra receta:
+        ids_recetas = self.dar_ids_recetas()
+        if isinstance(id_receta, int) and 0 <= id_receta < len(ids_recetas):
+            return ids_recetas[id_receta]
+        return None
 
-        # Comprobar si la receta para agregar ya existe en las recetas:
-        receta_existente = session.query(Receta).filter_by(nombre=nombre).first()
+    def cerrar_sesion(self):
+        # Libera la sesion del hilo actual (por ejemplo al terminar un hilo de trabajo):
+        session.remove()
+
+    def invalidar_recetas(self):
+        # Se debe llamar cada vez que cambia el conjunto, el orden o los datos de las recetas:
+        with self.candado_cache:
+            self.version_recetas += 1
+            self.cache_recetas = None
+            self.ids_recetas = None
+        self.invalidar_preparaciones()
+
+    def invalidar_ingredientes(self):
+        # Se debe llamar cada vez que cambia el conjunto, el orden o los datos de los ingredientes:
+        with self.candado_cache:
+            self.version_ingredientes += 1
+            self.cache_ingredientes = None
+            self.indice_ingredientes = None
+        self.invalidar_preparaciones()
+
+    def invalidar_preparaciones(self):
+        # Se debe llamar cada vez que cambian los ingredientes de una receta o sus cantidades:
+        with self.candado_preparaciones:
+            self.version_preparaciones += 1
+            self.memo_preparaciones.clear()
+
+    @contextmanager
+    def usar_perfil(self, trabajo):
+        # Conecta la sesion del hilo al motor del perfil del trabajo mientras dura el bloque. Un bloque dentro de
+        # otro sigue con la sesion de afuera, para no partir una transaccion en dos conexiones:
+        perfil = self.perfiles.get(trabajo)
+        # Una base de datos en memoria no se puede abrir con otro motor:
+        if engine.url.database in (None, '', ':memory:'):
+            perfil = None
+        if perfil is None or getattr(self.trabajo_hilo, 'trabajo', None) is not None:
+            yield
+            return
+        with self.candado_cache:
+            motor = self.motores.get(trabajo)
+            if motor is None:
+                motor = self.motores[trabajo] = crear_motor(str(engine.url), perfil)
+        self.trabajo_hilo.trabajo = trabajo
+        try:
+            with sesion_con_motor(motor):
+                yield
+        finally:
+            self.trabajo_hilo.trabajo = None
+
+    def cerrar_motores(self):
+        # Cierra las conexiones de los motores de los perfiles:
+        with self.candado_cache:
+            motores, self.motores = self.motores, {}
+        for motor in motores.values():
+            motor.dispose()
+
+    def dar_estadisticas_cache(self):
+        with self.candado_cache:
+            return dict(self.estadisticas_cache)
+
+    def validar_crear_editar_receta(self, id_receta, nombre, tiempo, personas, calorias, preparacion, modo):
+        # Comprobar si la receta para agregar ya existe en las recetas. Solo se consulta el id (indice unico del
+        # nombre) y al editar se compara con el id de la receta que se edita:
+        receta_existente = session.query(Receta.id).filter(Receta.nombre == nombre).first()
+        repetida = False
         if receta_existente is not None:
-            recetas = self.dar_recetas()
-            id_repetido = next((i for i in range(len(recetas)) if recetas[i]["nombre"] == receta_existente.nombre),
-                               None)
+            repetida = modo == self.EVENTO_AGREGAR_RECETA or (
+                    modo == self.EVENTO_EDITAR_RECETA and receta_existente.id != self.dar_id_receta(id_receta))
+
+        return self.mensaje_error_receta(nombre, tiempo, personas, calorias, preparacion,
+                                         receta_existente is not None, repetida)
+
+    def mensaje_error_receta(self, nombre, tiempo, personas, calorias, preparacion, existente, repetida):
+        # Reglas de una receta sin consultar la base de datos. existente indica si ya hay una receta con el
+        # nombre y repetida si esa receta es distinta a la que se esta validando:
+        mensaje_error = ""
 
         # Comprobar que sean numeros:
         try:
@@ -54,7 +330,7 @@ class LogicaRecetario(FachadaRecetario):
                 mensaje_error = "El nombre de la receta debe ser un valor de cadena de caracteres"
             elif tiempo == "":
                 mensaje_error = "El tiempo de la receta no puede estar vacio"
-            elif (not isinstance(tiempo, str)) or (not re.match(patron, tiempo)):
+            elif (not isinstance(tiempo, str)) or (not PATRON_TIEMPO.match(tiempo)):
                 mensaje_error = "El tiempo de la receta no tiene el formato correcto"
             elif personas == "":
                 mensaje_error = "El número de personas de la receta no puede estar vacio"
@@ -64,10 +340,8 @@ class LogicaRecetario(FachadaRecetario):
                 mensaje_error = "El número de calorias de la receta no puede estar vacio"
             elif float(calorias) <= 0:
                 mensaje_error = "El número de calorias de la receta debe ser un numero positivo mayor que 0."
-            elif receta_existente:
-                if modo == self.EVENTO_AGREGAR_RECETA or (
-                        modo == self.EVENTO_EDITAR_RECETA and id_receta != id_repetido):
-                    mensaje_error = f"Ya existe una receta con el nombre '{nombre}'"
+            elif existente and repetida:
+                mensaje_error = f"Ya existe una receta con el nombre '{nombre}'"
             elif preparacion == "":
                 mensaje_error = "La preparacion de la receta no puede tener un valor vacio"
             elif (not isinstance(preparacion, str)) or (preparacion.isdigit()):
@@ -81,15 +355,49 @@ class LogicaRecetario(FachadaRecetario):
         return mensaje_error
 
     def crear_receta(self, nombre, tiempo, personas, calorias, preparacion):
-        if self.validar_crear_editar_receta(-1, nombre, tiempo, personas, calorias, preparacion,
-                                            self.EVENTO_AGREGAR_RECETA) == "":
-            recetaNueva = Receta(nombre=nombre, tiempo=tiempo, personas=personas, calorias=calorias,
-                                 preparacion=preparacion)
-            session.add(recetaNueva)
-            session.commit()
-            return True
-        else:
-            return False
+        return self.guardar_receta(-1, nombre, tiempo, personas, calorias, preparacion) == ""
+
+    def guardar_receta(self, id_receta, nombre, tiempo, personas, calorias, preparacion):
+        # Crea la receta (id_receta == -1) o edita la que esta en esa posicion. Retorna el mensaje de la validacion,
+        # "" si la receta se guardo:
+        if id_receta != -1:
+            return self.mensaje_editar_receta(id_receta, nombre, tiempo, personas, calorias, preparacion)
+        validacion = self.validar_crear_editar_receta(id_receta, nombre, tiempo, personas, calorias, preparacion,
+                                                      self.EVENTO_AGREGAR_RECETA)
+        if validacion == "":
+            with transaccion():
+                session.add(Receta(nombre=nombre, tiempo=tiempo, personas=personas, calorias=calorias,
+                                   preparacion=preparacion))
+            self.invalidar_recetas()
+        return validacion
+
+    def mensaje_editar_receta(self, id_receta, nombre, tiempo, personas, calorias, preparacion):
+        # Las reglas de formato no consultan la base de datos. La existencia de la receta y el nombre repetido se
+        # comprueban en la misma sentencia UPDATE ... WHERE id = ? AND NOT EXISTS (otra receta con ese nombre); solo
+        # si no cambia ninguna fila se consulta la causa para el mensaje:
+        validacion = self.mensaje_error_receta(nombre, tiempo, personas, calorias, preparacion, False, False)
+        if validacion != "":
+            # El nombre repetido se informa antes que las reglas de la preparacion, asi que con un error se valida
+            # completo para dar el mismo mensaje que validar_crear_editar_receta:
+            return self.validar_crear_editar_receta(id_receta, nombre, tiempo, personas, calorias, preparacion,
+                                                    self.EVENTO_EDITAR_RECETA)
+        id_bd = self.dar_id_receta_escritura(id_receta)
+        if id_bd is None:
+            return "La receta que se quiere editar no existe"
+        otra = aliased(Receta)
+        with transaccion():
+            editadas = session.query(Receta).filter(
+                Receta.id == id_bd,
+                ~exists().where(and_(otra.nombre == nombre, otra.id != id_bd))
+            ).update(self.valores_receta(nombre, tiempo, personas, calorias, preparacion), synchronize_session=False)
+            if not editadas:
+                repetida = session.query(exists().where(and_(Receta.nombre == nombre, Receta.id != id_bd))).scalar()
+        if not editadas:
+            if repetida:
+                return self.mensaje_error_receta(nombre, tiempo, personas, calorias, preparacion, True, True)
+            return "La receta que se quiere editar no existe"
+        self.invalidar_recetas()
+        return ""
 
     def editar_receta(self, id_receta, nombre, tiempo, personas, calorias, preparacion):
         """
@@ -107,36 +415,80 @@ class LogicaRecetario(FachadaRecetario):
         Returns:
         bool: True si la receta se editó exitosamente, False si no se encontró la receta con el ID dado.
         """
-        receta = self.dar_receta(id_receta)
-        id_orig = receta['id']
-        busqueda = receta
-        if busqueda:
-            if self.validar_crear_editar_receta(id_receta, nombre, tiempo, personas, calorias, preparacion,
-                                                modo=self.EVENTO_EDITAR_RECETA) == "":
-                # Receta anterior:
-                receta = session.query(Receta).filter_by(id=id_orig).first()
-                receta.nombre = nombre
-                receta.tiempo = tiempo
-                receta.personas = personas
-                receta.calorias = calorias
-                receta.preparacion = preparacion
-                session.commit()
-                return True
-            else:
-                return False
-        else:
-            return False
+        return self.mensaje_editar_receta(id_receta, nombre, tiempo, personas, calorias, preparacion) == ""
+
+    def valores_receta(self, nombre, tiempo, personas, calorias, preparacion):
+        # Columnas de una receta para un UPDATE por id. El tiempo se guarda en segundos:
+        return {Receta.nombre: nombre, Receta.tiempo_segundos: segundos_de_tiempo(tiempo), Receta.personas: personas,
+                Receta.calorias: calorias, Receta.preparacion: preparacion}
 
     def eliminar_receta(self, id_receta):
-        del self.recetas[id_receta]
+        # Se borran primero los ingredientes de la receta y luego la receta, con un DELETE por tabla y en la misma
+        # transaccion. No se cargan filas: la base de datos resuelve los ids de la receta:
+        id_bd = self.dar_id_receta_escritura(id_receta)
+        if id_bd is None:
+            return False
+        with transaccion():
+            session.query(IngredienteReceta).filter(IngredienteReceta.receta_id == id_bd).delete(
+                synchronize_session=False)
+            eliminadas = session.query(Receta).filter(Receta.id == id_bd).delete(synchronize_session=False)
+        self.invalidar_recetas()
+        return eliminadas == 1
 
     def dar_ingredientes(self):
-        # Equivale a en SQL poner: SELECT * FROM ingrediente ORDER BY nombre ASC, unidad ASC, sitioCompra ASC:
-        ingredientes = [elem.__dict__ for elem in session.query(Ingrediente).order_by(
-            asc(Ingrediente.nombre),
-            asc(Ingrediente.unidad),
-            asc(Ingrediente.sitioCompra)).all()]
-        return ingredientes
+        with self.candado_cache:
+            ingredientes = self.cache_ingredientes
+            if ingredientes is not None:
+                self.estadisticas_cache['aciertos'] += 1
+                return list(ingredientes)
+            self.estadisticas_cache['fallos'] += 1
+            version = self.version_ingredientes
+        # Equivale a en SQL poner: SELECT * FROM ingrediente ORDER BY nombre ASC, unidad ASC, sitioCompra ASC, id ASC.
+        # migrar_esquema no crea el indice unico de nombre y unidad si la base ya tiene repetidos, asi que el sitio de
+        # compra y el id desempatan para que las posiciones de la lista no cambien entre consultas:
+        with self.usar_perfil('listar'):
+            ingredientes = tuple(RegistroIngrediente(*fila) for fila in session.query(
+                *RegistroIngrediente.columnas(Ingrediente)).order_by(
+                asc(Ingrediente.nombre),
+                asc(Ingrediente.unidad),
+                asc(Ingrediente.sitioCompra),
+                asc(Ingrediente.id)).all())
+        with self.candado_cache:
+            if version == self.version_ingredientes:
+                self.cache_ingredientes = ingredientes
+        return list(ingredientes)
+
+    @con_perfil('listar')
+    def dar_ingredientes_pagina(self, tamano_pagina, cursor=None):
+        if tamano_pagina < 1:
+            raise ValueError("El tamaño de la página debe ser mayor que cero")
+        # Orden de dar_ingredientes con el id como desempate, para que el cursor sea una llave estable:
+        orden = [Ingrediente.nombre, Ingrediente.unidad, Ingrediente.sitioCompra, Ingrediente.id]
+        consulta = session.query(*RegistroIngrediente.columnas(Ingrediente))
+        if cursor is not None:
+            consulta = consulta.filter(despues_de(orden, cursor))
+        filas = consulta.order_by(*orden).limit(tamano_pagina + 1).all()
+        ingredientes = [RegistroIngrediente(*fila) for fila in filas[:tamano_pagina]]
+        siguiente = None
+        if len(filas) > tamano_pagina:
+            ultimo = ingredientes[-1]
+            siguiente = (ultimo.nombre, ultimo.unidad, ultimo.sitioCompra, ultimo.id)
+        return ingredientes, siguiente
+
+    def completar_ingredientes(self, prefijo, limite=10, aproximado=True):
+        return self.dar_indice_ingredientes().sugerir(prefijo, limite, aproximado)
+
+    def dar_indice_ingredientes(self):
+        # El indice se construye con la lista de ingredientes la primera vez que se usa despues de cada cambio:
+        with self.candado_cache:
+            indice = self.indice_ingredientes
+            version = self.version_ingredientes
+        if indice is None:
+            indice = IndiceIngredientes(self.dar_ingredientes())
+            with self.candado_cache:
+                if version == self.version_ingredientes:
+                    self.indice_ingredientes = indice
+        return indice
 
     def dar_ingrediente(self, id_ingrediente):
         ingredientes = self.dar_ingredientes()
@@ -145,9 +497,14 @@ class LogicaRecetario(FachadaRecetario):
         except:
             return ingredientes[id_ingrediente - 1]
 
-    def validar_crear_editar_ingrediente(self, nombre, unidad, valor, sitioCompra, modo, id_ingrediente):
-        mensaje_error = ""
+    def dar_id_ingrediente_escritura(self, id_ingrediente):
+        # Igual a dar_id_receta_escritura, con la lista de ingredientes:
+        ingredientes = self.dar_ingredientes()
+        if isinstance(id_ingrediente, int) and 0 <= id_ingrediente < len(ingredientes):
+            return ingredientes[id_ingrediente]['id']
+        return None
 
+    def validar_crear_editar_ingrediente(self, nombre, unidad, valor, sitioCompra, modo, id_ingrediente):
         # Comprobar si la receta para agregar ya existe en las recetas:
         ingrediente_existente = session.query(Ingrediente).filter(
             and_(Ingrediente.nombre == nombre, Ingrediente.unidad == unidad)).first()
@@ -155,6 +512,15 @@ class LogicaRecetario(FachadaRecetario):
         if id_ingrediente != -1:  # Solo entra a este if en modo edicion
             id_db = self.dar_ingrediente(id_ingrediente)['id']
 
+        repetido = ingrediente_existente is not None and (
+                modo == "crear" or (modo == "editar" and ingrediente_existente.id != id_db))
+        return self.mensaje_error_ingrediente(nombre, unidad, valor, sitioCompra, repetido)
+
+    def mensaje_error_ingrediente(self, nombre, unidad, valor, sitioCompra, repetido):
+        # Reglas de un ingrediente sin consultar la base de datos. repetido indica si ya hay otro ingrediente
+        # con el mismo nombre y unidad:
+        mensaje_error = ""
+
         # Comprobar que sean numeros:
         try:
             if nombre == "":
@@ -173,95 +539,104 @@ class LogicaRecetario(FachadaRecetario):
                 mensaje_error = "El sitio de compra del ingrediente no puede estar vacio"
             elif (not isinstance(sitioCompra, str)) or (sitioCompra.isdigit()):
                 mensaje_error = "El sitio de compra del ingrediente debe ser un valor de cadena de caracteres"
-            elif ingrediente_existente:
-                if modo == "crear" or (modo == "editar" and ingrediente_existente.id != id_db):
-                    mensaje_error = f"Ya existe un ingrediente con el nombre '{nombre}' y la unidad '{unidad}'"
+            elif repetido:
+                mensaje_error = f"Ya existe un ingrediente con el nombre '{nombre}' y la unidad '{unidad}'"
         except ValueError as e:
             mensaje_error = "El valor de la unidad debe ser un número"
             return mensaje_error
         return mensaje_error
 
     def crear_ingrediente(self, nombre, unidad, valor, sitioCompra):
-        if self.validar_crear_editar_ingrediente(nombre, unidad, valor, sitioCompra, "crear", -1) == "":
-            ingredienteNuevo = Ingrediente(nombre=nombre, unidad=unidad, valor=valor, sitioCompra=sitioCompra)
-            session.add(ingredienteNuevo)
-            session.commit()
-            return True
-        else:
-            return False
+        return self.guardar_ingrediente(-1, nombre, unidad, valor, sitioCompra) == ""
+
+    def guardar_ingrediente(self, id_ingrediente, nombre, unidad, valor, sitioCompra):
+        # Igual a guardar_receta: crea el ingrediente (id_ingrediente == -1) o edita el que esta en esa posicion y
+        # retorna el mensaje de la validacion:
+        if id_ingrediente != -1:
+            return self.mensaje_editar_ingrediente(id_ingrediente, nombre, unidad, valor, sitioCompra)
+        validacion = self.validar_crear_editar_ingrediente(nombre, unidad, valor, sitioCompra, "crear", -1)
+        if validacion == "":
+            with transaccion():
+                session.add(Ingrediente(nombre=nombre, unidad=unidad, valor=valor, sitioCompra=sitioCompra))
+            self.invalidar_ingredientes()
+        return validacion
+
+    def mensaje_editar_ingrediente(self, id_ingrediente, nombre, unidad, valor, sitioCompra):
+        # Igual a mensaje_editar_receta: un solo UPDATE por id que no modifica nada si otro ingrediente ya tiene el
+        # mismo nombre y unidad, y una consulta para el mensaje solo si no cambio ninguna fila:
+        validacion = self.mensaje_error_ingrediente(nombre, unidad, valor, sitioCompra, False)
+        if validacion != "":
+            return validacion
+        id_bd = self.dar_id_ingrediente_escritura(id_ingrediente)
+        if id_bd is None:
+            return "El ingrediente que se quiere editar no existe"
+        otro = aliased(Ingrediente)
+        with transaccion():
+            editados = session.query(Ingrediente).filter(
+                Ingrediente.id == id_bd,
+                ~exists().where(and_(otro.nombre == nombre, otro.unidad == unidad, otro.id != id_bd))
+            ).update({Ingrediente.nombre: nombre, Ingrediente.unidad: unidad, Ingrediente.valor: valor,
+                      Ingrediente.sitioCompra: sitioCompra}, synchronize_session=False)
+            if not editados:
+                repetido = session.query(exists().where(and_(
+                    Ingrediente.nombre == nombre, Ingrediente.unidad == unidad, Ingrediente.id != id_bd))).scalar()
+        if not editados:
+            if repetido:
+                return self.mensaje_error_ingrediente(nombre, unidad, valor, sitioCompra, True)
+            return "El ingrediente que se quiere editar no existe"
+        self.invalidar_ingredientes()
+        return ""
 
     def editar_ingrediente(self, id_ingrediente, nombre, unidad, valor, sitioCompra):
-        id_ingrediente = self.dar_ingrediente(id_ingrediente)['id']
-        busqueda = self.dar_ingrediente(id_ingrediente)
-        if busqueda:
-            if self.validar_crear_editar_ingrediente(nombre, unidad, valor, sitioCompra, "editar",
-                                                     id_ingrediente) == "":
-                ingrediente = session.query(Ingrediente).filter(Ingrediente.id == id_ingrediente).first()
-                ingrediente.nombre = nombre
-                ingrediente.unidad = unidad
-                ingrediente.valor = valor
-                ingrediente.sitioCompra = sitioCompra
-                session.commit()
-                return True
-            else:
-                return False
-        else:
-            return False
+        return self.mensaje_editar_ingrediente(id_ingrediente, nombre, unidad, valor, sitioCompra) == ""
 
     def eliminar_ingrediente(self, id_ingrediente):
-        try:
-            # Buscar el ingrediente por su id
-            ingrediente = self.dar_ingrediente(id_ingrediente)
+        # ID del ingrediente de la base de datos:
+        id_bd = self.dar_id_ingrediente_escritura(id_ingrediente)
+        if id_bd is None:
+            return False
 
-            # Datos del ingrediente:
-            nombre_ingrediente = ingrediente['nombre']
-            unidad = ingrediente['unidad']
-            valor = ingrediente['valor']
-            sitioCompra = ingrediente['sitioCompra']
+        # Si el ingrediente está asociado a una receta NO se puede eliminar. La comprobacion va en el mismo
+        # DELETE (usa el indice de ingrediente_receta que empieza por ingrediente_id):
+        with transaccion():
+            eliminados = session.query(Ingrediente).filter(
+                Ingrediente.id == id_bd,
+                ~exists().where(IngredienteReceta.ingrediente_id == id_bd)).delete(synchronize_session=False)
+        if eliminados:
+            self.invalidar_ingredientes()
+            return True
+        return False
 
-            ingrediente = session.query(Ingrediente).filter(
-                and_(
-                    Ingrediente.nombre == nombre_ingrediente,
-                    Ingrediente.unidad == unidad,
-                    Ingrediente.valor == valor,
-                    Ingrediente.sitioCompra == sitioCompra
-                )
-            ).first()
-
-            # ID del ingrediente de la base de datos:
-            id_ingrediente = ingrediente.id
-
-            # Si se encontró el ingrediente, eliminarlo de la base de datos
-            if ingrediente:
-                # Si el ingrediente está asociado a una receta NO se puede eliminar:
-                existe = session.query(IngredienteReceta).filter(
-                    IngredienteReceta.ingrediente_id == id_ingrediente).all()
-                if not existe:
-                    session.delete(ingrediente)
-                    session.commit()
-                    return True
-            return False
-        except:
-            return False
+    def dar_recetas_ingrediente(self, id_ingrediente):
+        # Recetas que usan el ingrediente, en el orden de la lista de recetas:
+        id_bd = self.dar_ingrediente(id_ingrediente)['id']
+        filas = session.query(Receta.id, Receta.nombre, IngredienteReceta.cantidad).join(
+            IngredienteReceta, IngredienteReceta.receta_id == Receta.id).filter(
+            IngredienteReceta.ingrediente_id == id_bd).order_by(asc(Receta.nombre)).all()
+        return [{"id": fila.id, "receta": fila.nombre, "cantidad": fila.cantidad} for fila in filas]
+
+    def contar_usos_ingrediente(self, id_ingrediente):
+        id_bd = self.dar_ingrediente(id_ingrediente)['id']
+        return session.query(func.count(IngredienteReceta.id)).filter(
+            IngredienteReceta.ingrediente_id == id_bd).scalar()
 
     def dar_ingredientes_receta(self, id_receta):
-        id_receta = self.dar_receta(id_receta)['id']
-        ingredientes_bd = session.query(Ingrediente).filter(
-            Ingrediente.recetas.any(Receta.id.in_([id_receta]))).order_by(
+        id_receta = self.dar_id_receta(id_receta)
+        # Una sola consulta con el ingrediente y la cantidad de la asociacion:
+        filas = session.query(Ingrediente.nombre, Ingrediente.unidad, IngredienteReceta.cantidad).join(
+            IngredienteReceta, IngredienteReceta.ingrediente_id == Ingrediente.id).filter(
+            IngredienteReceta.receta_id == id_receta).order_by(
             asc(Ingrediente.nombre),
             asc(Ingrediente.unidad),
             asc(Ingrediente.sitioCompra)).all()
-        ingredientes = []
-        for elem in ingredientes_bd:
-            cantidad = session.query(IngredienteReceta).filter(and_(IngredienteReceta.ingrediente_id == elem.id,
-                                                                    IngredienteReceta.receta_id == id_receta)).first().cantidad
-            ingredientes.append({'ingrediente': elem.nombre, 'unidad': elem.unidad, 'cantidad': cantidad})
-        return ingredientes
+        return [{'ingrediente': fila.nombre, 'unidad': fila.unidad, 'cantidad': fila.cantidad} for fila in filas]
 
     def dar_ingrediente_receta(self, id_ingrediente_receta):
-        ing_receta = session.query(IngredienteReceta).filter(
-            IngredienteReceta.id == id_ingrediente_receta).first().__dict__
-        return ing_receta
+        fila = session.query(*RegistroIngredienteReceta.columnas(IngredienteReceta)).filter(
+            IngredienteReceta.id == id_ingrediente_receta).first()
+        if fila is None:
+            return None
+        return RegistroIngredienteReceta(*fila)
 
     def agregar_ingrediente_receta(self, receta, ingrediente, cantidad):
         if self.validar_crear_editar_ingReceta(receta, ingrediente, cantidad, "agregar", -1) == "":
@@ -275,10 +650,9 @@ class LogicaRecetario(FachadaRecetario):
                     receta_id=receta.id,  # ID de la receta
                     cantidad=cantidad  # Cantidad del ingrediente en la receta
                 )
-                session.add(ingrediente_receta)
-
-                # receta.ingredientes.append(ingrediente)
-                session.commit()
+                with transaccion():
+                    session.add(ingrediente_receta)
+                self.invalidar_preparaciones()
                 return True
             else:
                 return False
@@ -292,12 +666,13 @@ class LogicaRecetario(FachadaRecetario):
         if busqueda:
             if self.validar_crear_editar_ingReceta(receta, ingrediente, cantidad, "editar",
                                                    id_ingrediente_receta) == "":
-                ing_receta = session.query(IngredienteReceta).filter(
-                    IngredienteReceta.id == id_ingrediente_receta).first()
-                ing_receta.receta_id = receta['id']
-                ing_receta.ingrediente_id = ingrediente['id']
-                ing_receta.cantidad = cantidad
-                session.commit()
+                with transaccion():
+                    ing_receta = session.query(IngredienteReceta).filter(
+                        IngredienteReceta.id == id_ingrediente_receta).first()
+                    ing_receta.receta_id = receta['id']
+                    ing_receta.ingrediente_id = ingrediente['id']
+                    ing_receta.cantidad = cantidad
+                self.invalidar_preparaciones()
                 return True
             else:
                 return False
@@ -305,16 +680,22 @@ class LogicaRecetario(FachadaRecetario):
             return False
 
     def eliminar_ingrediente_receta(self, id_ingrediente_receta, receta):
-        indice_en_receta = 0
-        iteracion = 0
-        for ingrediente_receta in self.ingredientes_recetas:
-            if ingrediente_receta['receta'] == receta['receta']:
-                if indice_en_receta == id_ingrediente_receta:
-                    del self.ingredientes_recetas[iteracion]
-
-                indice_en_receta += 1
-
-            iteracion += 1
+        # id_ingrediente_receta es la posicion en dar_ingredientes_receta. La asociacion en esa posicion se busca en
+        # una subconsulta del mismo DELETE, con el orden de esa lista. SQLite toma un OFFSET negativo como 0:
+        if not isinstance(id_ingrediente_receta, int) or id_ingrediente_receta < 0:
+            return False
+        asociacion = session.query(IngredienteReceta.id).join(
+            Ingrediente, IngredienteReceta.ingrediente_id == Ingrediente.id).filter(
+            IngredienteReceta.receta_id == receta['id']).order_by(
+            asc(Ingrediente.nombre),
+            asc(Ingrediente.unidad),
+            asc(Ingrediente.sitioCompra)).limit(1).offset(id_ingrediente_receta).subquery()
+        with transaccion():
+            eliminadas = session.query(IngredienteReceta).filter(
+                IngredienteReceta.id.in_(session.query(asociacion.c.id))).delete(synchronize_session=False)
+        if eliminadas:
+            self.invalidar_preparaciones()
+        return eliminadas == 1
 
     def validar_crear_editar_ingReceta(self, receta, ingrediente, cantidad, modo, id_ingrediente_receta):
         mensaje_error = ""
@@ -328,72 +709,369 @@ class LogicaRecetario(FachadaRecetario):
         if id_ingrediente_receta != -1:  # Solo entra a este if en modo edicion
             id_db = self.dar_ingrediente_receta(id_ingrediente_receta)['id']
 
+        repetido = ingrediente_receta_existente is not None and (
+                modo == "agregar" or (modo == "editar" and ingrediente_receta_existente.id != id_db))
+        return self.mensaje_error_ingrediente_receta(cantidad, ingrediente_busc.nombre, receta_busc.nombre, repetido)
+
+    def mensaje_error_ingrediente_receta(self, cantidad, nombre_ingrediente, nombre_receta, repetido):
+        # Reglas de un ingrediente de una receta sin consultar la base de datos. repetido indica si el ingrediente
+        # ya esta en la receta en otra asociacion:
+        mensaje_error = ""
         try:
             if cantidad == "":
                 mensaje_error = "La cantidad no puede ser vacio."
             elif int(cantidad) <= 0:
                 mensaje_error = "La cantidad debe ser un número positivo."
-            elif ingrediente_receta_existente:
-                if modo == "agregar" or (modo == "editar" and ingrediente_receta_existente.id != id_db):
-                    mensaje_error = f"El ingrediente {ingrediente_busc.nombre} ya está asociado a la receta {receta_busc.nombre}"
+            elif repetido:
+                mensaje_error = f"El ingrediente {nombre_ingrediente} ya está asociado a la receta {nombre_receta}"
         except ValueError:
             mensaje_error = "La cantidad debe ser un número"
             return mensaje_error
         return mensaje_error
 
-    def dar_preparacion(self, id_receta, cantidad_personas):
-        receta = self.dar_receta(id_receta)
-        id_orig = receta['id']
-        if receta:
+    def validar_recetas(self, recetas):
+        return self.mensajes_error_recetas(recetas, set())
 
-            # Tiempo de preparación total de la receta:
-            tiempo_receta = receta['tiempo'].split(":")
+    def mensajes_error_recetas(self, recetas, vistos):
+        # Valida un lote de recetas con una sola consulta para los nombres que ya existen. Una receta con 'id_receta'
+        # (posicion en la lista) se valida como edicion de esa receta. vistos son los nombres de las recetas validas
+        # de lotes anteriores y se actualiza con las de este lote:
+        nombres = {receta.get('nombre', "") for receta in recetas}
+        existentes = {}
+        for bloque in bloques(nombres):
+            existentes.update(session.query(Receta.nombre, Receta.id).filter(Receta.nombre.in_(bloque)).all())
+        mensajes = []
+        for receta in recetas:
+            nombre = receta.get('nombre', "")
+            if nombre in vistos:
+                existente = repetida = True
+            else:
+                existente = nombre in existentes
+                repetida = existente and ('id_receta' not in receta or
+                                         existentes[nombre] != self.dar_id_receta(receta['id_receta']))
+            mensaje_error = self.mensaje_error_receta(nombre, receta.get('tiempo', ""), receta.get('personas', ""),
+                                                      receta.get('calorias', ""), receta.get('preparacion', ""),
+                                                      existente, repetida)
+            if mensaje_error == "":
+                vistos.add(nombre)
+            mensajes.append(mensaje_error)
+        return mensajes
 
-            horas, mins, segs = int(tiempo_receta[0]), int(tiempo_receta[1]), int(tiempo_receta[2])
+    def validar_ingredientes(self, ingredientes):
+        return self.mensajes_error_ingredientes(ingredientes, set())
 
-            total_segundos = horas * 3600 + mins * 60 + segs
+    def mensajes_error_ingredientes(self, ingredientes, vistos):
+        # Igual a mensajes_error_recetas, con el nombre y la unidad como llave y 'id_ingrediente' para las ediciones.
+        # Como en editar_ingrediente, la posicion de una edicion debe existir en la lista:
+        nombres = {ingrediente.get('nombre', "") for ingrediente in ingredientes}
+        existentes = {}
+        for bloque in bloques(nombres):
+            existentes.update({(fila.nombre, fila.unidad): fila.id for fila in session.query(
+                Ingrediente.nombre, Ingrediente.unidad, Ingrediente.id).filter(Ingrediente.nombre.in_(bloque))})
+        mensajes = []
+        for ingrediente in ingredientes:
+            nombre, unidad = ingrediente.get('nombre', ""), ingrediente.get('unidad', "")
+            llave = (nombre, unidad)
+            id_bd = None
+            if 'id_ingrediente' in ingrediente:
+                id_bd = self.dar_id_ingrediente_escritura(ingrediente['id_ingrediente'])
+                if id_bd is None:
+                    mensajes.append("El ingrediente que se quiere editar no existe")
+                    continue
+            repetido = llave in vistos or (llave in existentes and existentes[llave] != id_bd)
+            mensaje_error = self.mensaje_error_ingrediente(nombre, unidad, ingrediente.get('valor', ""),
+                                                           ingrediente.get('sitioCompra', ""), repetido)
+            if mensaje_error == "":
+                vistos.add(llave)
+            mensajes.append(mensaje_error)
+        return mensajes
 
-            if cantidad_personas < receta['personas']:
-                tiempo_preparacion = total_segundos - (
-                        (receta['personas'] - cantidad_personas) / (2 * receta['personas'])) * total_segundos
+    def validar_ingredientes_receta(self, ingredientes_receta):
+        # Cada fila tiene 'receta' (nombre), 'ingrediente', 'unidad' y 'cantidad'. Las recetas, los ingredientes y
+        # las asociaciones que ya existen se resuelven con una consulta por bloque de nombres de recetas:
+        nombres_ingredientes = {fila.get('ingrediente', "") for fila in ingredientes_receta}
+        ingredientes = set()
+        for bloque in bloques(nombres_ingredientes):
+            ingredientes.update(session.query(Ingrediente.nombre, Ingrediente.unidad).filter(
+                Ingrediente.nombre.in_(bloque)).all())
+        recetas = set()
+        asociados = set()
+        for bloque in bloques({fila.get('receta', "") for fila in ingredientes_receta}):
+            for fila in session.query(Receta.nombre, Ingrediente.nombre.label('ingrediente'),
+                                      Ingrediente.unidad).outerjoin(
+                    IngredienteReceta, IngredienteReceta.receta_id == Receta.id).outerjoin(
+                    Ingrediente, Ingrediente.id == IngredienteReceta.ingrediente_id).filter(Receta.nombre.in_(bloque)):
+                recetas.add(fila.nombre)
+                if fila.ingrediente is not None:
+                    asociados.add(tuple(fila))
+        mensajes = []
+        for fila in ingredientes_receta:
+            receta, ingrediente, unidad = fila.get('receta', ""), fila.get('ingrediente', ""), fila.get('unidad', "")
+            llave = (receta, ingrediente, unidad)
+            if receta not in recetas:
+                mensaje_error = f"No existe una receta con el nombre '{receta}'"
+            elif (ingrediente, unidad) not in ingredientes:
+                mensaje_error = f"No existe un ingrediente con el nombre '{ingrediente}' y la unidad '{unidad}'"
             else:
-                tiempo_preparacion = (cantidad_personas // receta['personas']) * (2 * (total_segundos / 3))
+                mensaje_error = self.mensaje_error_ingrediente_receta(fila.get('cantidad', ""), ingrediente, receta,
+                                                                      llave in asociados)
+            if mensaje_error == "":
+                asociados.add(llave)
+            mensajes.append(mensaje_error)
+        return mensajes
 
-            n_horas = int(tiempo_preparacion // 3600)
-            segs_restantes = tiempo_preparacion % 3600
-            n_mins = int(segs_restantes // 60)
-            n_segs = int(segs_restantes % 60)
+    def dar_preparacion(self, id_receta, cantidad_personas):
+        id_bd = self.dar_id_receta(id_receta)
+        with self.candado_preparaciones:
+            llave = (id_bd, cantidad_personas, self.version_preparaciones)
+            preparacion = self.memo_preparaciones.get(llave)
+            if preparacion is not None:
+                self.memo_preparaciones.move_to_end(llave)
+        if preparacion is None:
+            receta = self.dar_receta_preparacion(id_bd)
+            if not receta:
+                return None
+            preparacion = self.calcular_preparacion(receta, self.dar_lineas_preparacion(id_bd), cantidad_personas)
+            with self.candado_preparaciones:
+                # Si los datos cambiaron mientras se calculaba, el resultado no se guarda:
+                if llave[2] == self.version_preparaciones:
+                    self.memo_preparaciones[llave] = preparacion
+                    if len(self.memo_preparaciones) > self.TAMANO_MEMO_PREPARACIONES:
+                        self.memo_preparaciones.popitem(last=False)
+        # Se retorna una copia para que quien la use no pueda modificar la preparacion guardada:
+        return copy.deepcopy(preparacion)
 
-            tiempo_nuevo = '{:02d}:{:02d}:{:02d}'.format(n_horas, n_mins, n_segs)
+    def dar_receta_preparacion(self, id_bd):
+        # Datos de la receta que usa la preparacion, con el tiempo en segundos tal como esta guardado:
+        return session.query(Receta.nombre, Receta.tiempo_segundos, Receta.personas, Receta.calorias).filter(
+            Receta.id == id_bd).first()
 
-            # Ingredientes de la preparación de la receta:
-            ingredientes = session.query(Ingrediente).filter(
-                Ingrediente.recetas.any(Receta.id.in_([id_orig]))).order_by(
-                asc(Ingrediente.nombre),
-                asc(Ingrediente.unidad),
-                asc(Ingrediente.sitioCompra)).all()
-            ingredientes_preparacion = []
-            costo_total = 0
-            # Se recorren los ingredientes ordenados:
-            for ingrediente in ingredientes:
-                # Cantidad de la asociación de receta - ingrediente:
-                asociacion = session.query(IngredienteReceta).filter(IngredienteReceta.receta_id == id_orig,
-                                                                     IngredienteReceta.ingrediente_id == ingrediente.id).first()
-                cantidad_prep_ing = math.ceil((asociacion.cantidad * cantidad_personas) / receta['personas'])
-                precio_prep_ing = cantidad_prep_ing * ingrediente.valor
-                ing_act = {"nombre": ingrediente.nombre,
-                           "unidad": ingrediente.unidad,
-                           "cantidad": cantidad_prep_ing,
-                           "valor": precio_prep_ing}
-                ingredientes_preparacion.append(ing_act)
-
-                costo_total += precio_prep_ing
-
-            # Diccionario con el resultado:
-            preparacion = {"receta": receta['nombre'],
-                           "personas": cantidad_personas, "calorias": receta['calorias'],
-                           "tiempo_preparacion": tiempo_nuevo,
-                           "costo": costo_total,
-                           "datos_ingredientes": ingredientes_preparacion}
-
-            return preparacion
+    def dar_lineas_preparacion(self, id_bd):
+        # Una sola consulta con los datos de cada ingrediente de la receta y su cantidad, en el orden de la lista
+        # de ingredientes:
+        return session.query(Ingrediente.nombre, Ingrediente.unidad, Ingrediente.valor,
+                             IngredienteReceta.cantidad).join(
+            IngredienteReceta, IngredienteReceta.ingrediente_id == Ingrediente.id).filter(
+            IngredienteReceta.receta_id == id_bd).order_by(
+            asc(Ingrediente.nombre),
+            asc(Ingrediente.unidad),
+            asc(Ingrediente.sitioCompra)).all()
+
+    def calcular_tiempo_preparacion(self, total_segundos, personas_receta, cantidad_personas):
+        # total_segundos es el tiempo de preparación total de la receta:
+        if cantidad_personas < personas_receta:
+            tiempo_preparacion = total_segundos - (
+                    (personas_receta - cantidad_personas) / (2 * personas_receta)) * total_segundos
+        else:
+            tiempo_preparacion = (cantidad_personas // personas_receta) * (2 * (total_segundos / 3))
+
+        return formatear_tiempo(tiempo_preparacion)
+
+    def dar_preparaciones(self, id_receta, cantidades_personas):
+        # Preparacion de una receta para muchas cantidades de personas con una sola lectura de los ingredientes. Los
+        # calculos de dar_preparacion se hacen sobre arreglos (ingredientes x cantidades de personas):
+        id_bd = self.dar_id_receta(id_receta)
+        receta = self.dar_receta_preparacion(id_bd)
+        if not receta:
+            return None
+        lineas = self.dar_lineas_preparacion(id_bd)
+        personas = np.asarray(cantidades_personas, dtype=np.int64)
+
+        # Tiempo de preparación para cada cantidad de personas:
+        total_segundos = receta.tiempo_segundos
+        tiempos = np.where(personas < receta.personas,
+                           total_segundos - ((receta.personas - personas) / (2 * receta.personas)) * total_segundos,
+                           (personas // receta.personas) * (2 * (total_segundos / 3)))
+
+        # Cantidades y precios de cada ingrediente para cada cantidad de personas:
+        cantidades_base = np.array([linea.cantidad for linea in lineas], dtype=np.int64).reshape(-1, 1)
+        valores = np.array([linea.valor for linea in lineas], dtype=np.float64).reshape(-1, 1)
+        cantidades = np.ceil((cantidades_base * personas) / receta.personas)
+        precios = cantidades * valores
+        # El costo se acumula ingrediente por ingrediente, en el mismo orden que dar_preparacion:
+        costos = [0] * len(personas)
+        if len(lineas) > 0:
+            costos = np.zeros(len(personas))
+            for precios_ingrediente in precios:
+                costos = costos + precios_ingrediente
+            costos = costos.tolist()
+
+        cantidades = cantidades.astype(np.int64).tolist()
+        precios = precios.tolist()
+        preparaciones = []
+        for j, cantidad_personas in enumerate(personas.tolist()):
+            preparaciones.append({"receta": receta.nombre,
+                                  "personas": cantidad_personas, "calorias": receta.calorias,
+                                  "tiempo_preparacion": formatear_tiempo(tiempos[j]),
+                                  "costo": costos[j],
+                                  "datos_ingredientes": [{"nombre": linea.nombre,
+                                                          "unidad": linea.unidad,
+                                                          "cantidad": cantidades[i][j],
+                                                          "valor": precios[i][j]} for i, linea in enumerate(lineas)]})
+        return preparaciones
+
+    def dar_lista_compras(self, menu):
+        # menu es una lista de (id_receta, cantidad_personas). Una sola consulta trae las lineas de todas las recetas
+        # del menu y las cantidades se suman por (nombre, unidad, sitioCompra):
+        menu = [(self.dar_id_receta(id_receta), cantidad_personas) for id_receta, cantidad_personas in menu]
+        if not menu:
+            return []
+        filas = session.query(IngredienteReceta.receta_id, Receta.personas, Ingrediente.nombre, Ingrediente.unidad,
+                              Ingrediente.sitioCompra, Ingrediente.valor, IngredienteReceta.cantidad).join(
+            Receta, Receta.id == IngredienteReceta.receta_id).join(
+            Ingrediente, Ingrediente.id == IngredienteReceta.ingrediente_id).filter(
+            IngredienteReceta.receta_id.in_(list({id_bd for id_bd, cantidad_personas in menu}))).all()
+        lineas_receta = {}
+        for fila in filas:
+            lineas_receta.setdefault(fila.receta_id, []).append(fila)
+
+        totales = {}
+        for id_bd, cantidad_personas in menu:
+            for linea in lineas_receta.get(id_bd, []):
+                # Misma cantidad que muestra dar_preparacion para la receta:
+                cantidad = math.ceil((linea.cantidad * cantidad_personas) / linea.personas)
+                total = totales.setdefault((linea.nombre, linea.unidad, linea.sitioCompra), [0, 0])
+                total[0] += cantidad
+                total[1] += cantidad * linea.valor
+
+        sitios = {}
+        for (nombre, unidad, sitioCompra), (cantidad, valor) in sorted(totales.items()):
+            sitio = sitios.setdefault(sitioCompra, {"sitioCompra": sitioCompra, "ingredientes": [], "costo": 0})
+            sitio["ingredientes"].append({"nombre": nombre, "unidad": unidad, "cantidad": cantidad, "valor": valor})
+            sitio["costo"] += valor
+        return [sitios[sitioCompra] for sitioCompra in sorted(sitios)]
+
+    def calcular_preparacion(self, receta, lineas, cantidad_personas):
+        # Cantidades y precios escalados de todos los ingredientes en una sola pasada (sin consultas):
+        cantidades = [math.ceil((linea.cantidad * cantidad_personas) / receta.personas) for linea in lineas]
+        precios = [cantidad * linea.valor for cantidad, linea in zip(cantidades, lineas)]
+        ingredientes_preparacion = [{"nombre": linea.nombre,
+                                     "unidad": linea.unidad,
+                                     "cantidad": cantidad,
+                                     "valor": precio} for linea, cantidad, precio in zip(lineas, cantidades, precios)]
+
+        # Diccionario con el resultado:
+        preparacion = {"receta": receta.nombre,
+                       "personas": cantidad_personas, "calorias": receta.calorias,
+                       "tiempo_preparacion": self.calcular_tiempo_preparacion(receta.tiempo_segundos, receta.personas,
+                                                                              cantidad_personas),
+                       "costo": sum(precios),
+                       "datos_ingredientes": ingredientes_preparacion}
+
+        return preparacion
+
+    @con_perfil('importar')
+    def importar_ingredientes_csv(self, archivo, tamano_lote=1000):
+        # Columnas: nombre, unidad, valor, sitioCompra. Cada lote se valida y se inserta con un solo commit:
+        importados = 0
+        rechazados = []
+        vistos = set()
+        for lote in leer_lotes_csv(archivo, tamano_lote):
+            # Una consulta por lote para los ingredientes que ya existen en la base de datos:
+            mensajes = self.mensajes_error_ingredientes([fila for linea, fila in lote], vistos)
+            nuevos = []
+            for (linea, fila), mensaje_error in zip(lote, mensajes):
+                if mensaje_error != "":
+                    rechazados.append({'linea': linea, 'mensaje': mensaje_error})
+                    continue
+                nuevos.append({'nombre': fila['nombre'], 'unidad': fila['unidad'], 'valor': float(fila['valor']),
+                               'sitioCompra': fila['sitioCompra']})
+            if nuevos:
+                with transaccion():
+                    session.bulk_insert_mappings(Ingrediente, nuevos)
+                importados += len(nuevos)
+        self.invalidar_ingredientes()
+        return {'importados': importados, 'rechazados': rechazados}
+
+    @con_perfil('importar')
+    def importar_recetas_csv(self, archivo, tamano_lote=1000):
+        # Columnas: nombre, tiempo, personas, calorias, preparacion. Cada lote se valida y se inserta con un solo
+        # commit:
+        importados = 0
+        rechazados = []
+        vistos = set()
+        for lote in leer_lotes_csv(archivo, tamano_lote):
+            # Una consulta por lote para las recetas que ya existen en la base de datos:
+            mensajes = self.mensajes_error_recetas([fila for linea, fila in lote], vistos)
+            nuevas = []
+            for (linea, fila), mensaje_error in zip(lote, mensajes):
+                if mensaje_error != "":
+                    rechazados.append({'linea': linea, 'mensaje': mensaje_error})
+                    continue
+                nuevas.append({'nombre': fila['nombre'], 'tiempo_segundos': segundos_de_tiempo(fila['tiempo']),
+                               'personas': int(fila['personas']),
+                               'calorias': float(fila['calorias']), 'preparacion': fila['preparacion']})
+            if nuevas:
+                with transaccion():
+                    session.bulk_insert_mappings(Receta, nuevas)
+                importados += len(nuevas)
+        self.invalidar_recetas()
+        return {'importados': importados, 'rechazados': rechazados}
+
+    def iterar_recetas(self, anidado=False, tamano_lote=1000):
+        # Recorre las recetas por id con un cursor que trae tamano_lote filas a la vez. Si anidado es True cada
+        # receta incluye la lista de sus ingredientes (un solo recorrido de un join agrupado por receta):
+        if not anidado:
+            for fila in session.query(*RegistroReceta.columnas(Receta)).order_by(Receta.id).yield_per(tamano_lote):
+                yield dict(RegistroReceta(*fila))
+            return
+        filas = session.query(*RegistroReceta.columnas(Receta), Ingrediente.nombre.label('ingrediente'),
+                              Ingrediente.unidad.label('unidad'), IngredienteReceta.cantidad).outerjoin(
+            IngredienteReceta, IngredienteReceta.receta_id == Receta.id).outerjoin(
+            Ingrediente, Ingrediente.id == IngredienteReceta.ingrediente_id).order_by(
+            Receta.id, Ingrediente.nombre, Ingrediente.unidad).yield_per(tamano_lote)
+        columnas_receta = len(RegistroReceta.campos)
+        for id_receta, grupo in itertools.groupby(filas, key=lambda fila: fila.id):
+            grupo = list(grupo)
+            receta = dict(RegistroReceta(*grupo[0][:columnas_receta]))
+            receta['ingredientes'] = [{'ingrediente': fila.ingrediente, 'unidad': fila.unidad,
+                                       'cantidad': fila.cantidad} for fila in grupo if fila.ingrediente is not None]
+            yield receta
+
+    def iterar_ingredientes(self, tamano_lote=1000):
+        for fila in session.query(*RegistroIngrediente.columnas(Ingrediente)).order_by(Ingrediente.id).yield_per(
+                tamano_lote):
+            yield dict(RegistroIngrediente(*fila))
+
+    def iterar_ingredientes_recetas(self, tamano_lote=1000):
+        for fila in session.query(IngredienteReceta.receta_id, Receta.nombre.label('receta'),
+                                  IngredienteReceta.ingrediente_id, Ingrediente.nombre.label('ingrediente'),
+                                  Ingrediente.unidad, IngredienteReceta.cantidad).join(
+            Receta, Receta.id == IngredienteReceta.receta_id).join(
+            Ingrediente, Ingrediente.id == IngredienteReceta.ingrediente_id).order_by(
+            IngredienteReceta.receta_id, IngredienteReceta.id).yield_per(tamano_lote):
+            yield fila._asdict()
+
+    @con_perfil('listar')
+    def exportar_catalogo(self, directorio, formato="csv", anidado=None, tamano_lote=1000):
+        if formato not in ("csv", "jsonl"):
+            raise ValueError("El formato de exportación debe ser 'csv' o 'jsonl'")
+        # En CSV los ingredientes de las recetas siempre van en un archivo aparte:
+        if anidado is None:
+            anidado = formato == "jsonl"
+        anidado = anidado and formato == "jsonl"
+
+        archivos = [("recetas", self.iterar_recetas(anidado, tamano_lote),
+                     RegistroReceta.campos),
+                    ("ingredientes", self.iterar_ingredientes(tamano_lote),
+                     RegistroIngrediente.campos)]
+        if not anidado:
+            archivos.append(("ingredientes_receta", self.iterar_ingredientes_recetas(tamano_lote),
+                             ('receta_id', 'receta', 'ingrediente_id', 'ingrediente', 'unidad', 'cantidad')))
+
+        os.makedirs(directorio, exist_ok=True)
+        conteo = {}
+        for nombre, filas, campos in archivos:
+            conteo[nombre] = 0
+            with open(os.path.join(directorio, nombre + "." + formato), "w", newline='', encoding='utf-8') as archivo:
+                if formato == "csv":
+                    escritor = csv.DictWriter(archivo, fieldnames=campos)
+                    escritor.writeheader()
+                    for fila in filas:
+                        escritor.writerow(fila)
+                        conteo[nombre] += 1
+                else:
+                    for fila in filas:
+                        archivo.write(json.dumps(fila, ensure_ascii=False) + "\n")
+                        conteo[nombre] += 1
+        return conteo
@@ -1,9 +1,130 @@
-from sqlalchemy import create_engine
+import os
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.pool import QueuePool
+
+URL_POR_DEFECTO = 'sqlite:///aplicacion.sqlite'
+
+# Perfiles de ajuste de SQLite. Cada llave es un PRAGMA que se ejecuta al abrir cada conexión:
+PERFILES = {
+    # Valores por defecto de SQLite:
+    'por_defecto': {},
+    # Cargas masivas: WAL evita reescribir la base completa en cada commit y synchronous=NORMAL
+    # solo sincroniza con el disco en los checkpoints.
+    'escritura': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'temp_store': 'MEMORY',
+        'foreign_keys': 'ON',
+    },
+    # Listados: además de lo anterior, las lecturas se hacen sobre el archivo mapeado en memoria.
+    'lectura': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'temp_store': 'MEMORY',
+        'mmap_size': 268435456,
+        'foreign_keys': 'ON',
+    },
+}
+
 
-engine = create_engine('sqlite:///aplicacion.sqlite')
+def crear_motor(url=URL_POR_DEFECTO, perfil='por_defecto', claves_foraneas=None):
+    ''' Crea el engine de la base de datos aplicando un perfil de ajuste de SQLite
+    Parámetros:
+        url (string): La URL de la base de datos
+        perfil (string o dict): El nombre de un perfil de PERFILES o un diccionario de PRAGMAs
+        claves_foraneas (bool): Activa o desactiva las claves foráneas sin importar el perfil.
+        None deja lo que diga el perfil
+    Retorna:
+        El engine de SQLAlchemy
+    '''
+    if isinstance(perfil, str):
+        perfil = PERFILES[perfil]
+    pragmas = dict(perfil)
+    if claves_foraneas is not None:
+        pragmas['foreign_keys'] = 'ON' if claves_foraneas else 'OFF'
+
+    if url.startswith('sqlite') and pragmas and ':memory:' not in url and url != 'sqlite://':
+        # Las conexiones se reutilizan para que la caché de páginas y el mmap sobrevivan entre
+        # transacciones (con el NullPool por defecto se abre un archivo nuevo en cada sesión):
+        motor = create_engine(url, poolclass=QueuePool, connect_args={'check_same_thread': False})
+    else:
+        motor = create_engine(url)
+    if motor.dialect.name == 'sqlite' and pragmas:
+        @event.listens_for(motor, 'connect')
+        def aplicar_pragmas(conexion_dbapi, registro_conexion):
+            cursor = conexion_dbapi.cursor()
+            for pragma, valor in pragmas.items():
+                cursor.execute('PRAGMA {} = {}'.format(pragma, valor))
+            cursor.close()
+    return motor
+
+
+engine = crear_motor(os.environ.get('RECETARIO_BD', URL_POR_DEFECTO),
+                     os.environ.get('RECETARIO_PERFIL', 'por_defecto'))
 Session = sessionmaker(bind=engine)
 
 Base = declarative_base()
-session = Session()
\ No newline at end of file
+# Sesión por hilo: session.query(...), session.commit(), etc. se delegan a la sesión del hilo que
+# hace el llamado, por lo que la lógica se puede usar desde hilos de trabajo sin compartir estado.
+session = scoped_session(Session)
+
+
+@contextmanager
+def transaccion():
+    ''' Ejecuta un bloque de escritura sobre la sesión del hilo actual. Hace commit si el bloque
+    termina bien y rollback si lanza una excepción, dejando la sesión lista para seguir usándose.
+    '''
+    try:
+        yield session
+        session.commit()
+    except:
+        session.rollback()
+        raise
+
+
+@contextmanager
+def sesion_con_motor(motor):
+    ''' Ejecuta un bloque con la sesión del hilo actual conectada a otro motor, por ejemplo uno de crear_motor con
+    otro perfil. Al terminar, el hilo vuelve a la sesión que tenía antes
+    '''
+    registro = session.registry
+    anterior = registro() if registro.has() else None
+    sesion = Session(bind=motor)
+    registro.set(sesion)
+    try:
+        yield sesion
+    finally:
+        sesion.close()
+        if anterior is None:
+            registro.clear()
+        else:
+            registro.set(anterior)
+
+
+@contextmanager
+def contar_sentencias(motor=engine):
+    ''' Registra las sentencias SQL que el hilo actual ejecuta sobre el motor mientras dura el bloque. Sirve para
+    medir cuántas idas a la base de datos hace una operación
+    Retorna:
+        (list): Las sentencias ejecutadas, en orden; len() es la cantidad
+    '''
+    sentencias = []
+    hilo = threading.get_ident()
+
+    def registrar(conexion, cursor, sentencia, parametros, contexto, varias):
+        # Las sesiones de otros hilos también usan el motor y no se cuentan:
+        if threading.get_ident() == hilo:
+            sentencias.append(sentencia)
+
+    event.listen(motor, 'before_cursor_execute', registrar)
+    try:
+        yield sentencias
+    finally:
+        event.remove(motor, 'before_cursor_execute', registrar)
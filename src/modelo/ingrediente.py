@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from .declarative_base import Base
@@ -7,6 +7,11 @@ from .declarative_base import Base
 # Modelo de un ingrediente:
 class Ingrediente(Base):
     __tablename__ = 'ingrediente'
+    __table_args__ = (
+        # No puede haber dos ingredientes con el mismo nombre y unidad. También da el orden de la lista de
+        # ingredientes:
+        Index('ix_ingrediente_nombre_unidad', 'nombre', 'unidad', unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     nombre = Column(String)
@@ -17,6 +22,12 @@ class Ingrediente(Base):
 
 class IngredienteReceta(Base):
     __tablename__ = 'ingrediente_receta'
+    __table_args__ = (
+        # Un ingrediente solo puede estar una vez en cada receta:
+        Index('ix_ingrediente_receta_ingrediente_receta', 'ingrediente_id', 'receta_id', unique=True),
+        # Ingredientes de una receta:
+        Index('ix_ingrediente_receta_receta', 'receta_id'),
+    )
 
     id = Column(Integer, primary_key=True)
 
@@ -24,9 +35,10 @@ class IngredienteReceta(Base):
         Integer,
         ForeignKey('ingrediente.id'))
 
+    # Con las claves foraneas activas, al borrar una receta se borran sus ingredientes:
     receta_id = Column(
         Integer,
-        ForeignKey('receta.id'))
+        ForeignKey('receta.id', ondelete='CASCADE'))
     
     cantidad = Column(Integer)
 
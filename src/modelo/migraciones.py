@@ -0,0 +1,170 @@
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from .declarative_base import Base
+
+
+# Indices de versiones anteriores que ya no se declaran en los modelos:
+INDICES_OBSOLETOS = [
+    # (nombre, unidad, sitioCompra): el indice unico de (nombre, unidad) ya da el mismo orden
+    'ix_ingrediente_orden',
+]
+
+
+def migrar_esquema(motor):
+    ''' Actualiza una base de datos existente (por ejemplo un aplicacion.sqlite creado con una
+    version anterior) con las columnas e indices declarados en los modelos. create_all no
+    modifica las tablas que ya existen, por lo que los cambios se hacen aqui uno por uno.
+    Parámetros:
+        motor: El engine de la base de datos a migrar
+    Retorna:
+        (list): Los nombres de los indices unicos que no se pudieron crear porque la tabla
+        tiene datos repetidos
+    '''
+    inspector = inspect(motor)
+    tablas_existentes = inspector.get_table_names()
+    if 'receta' in tablas_existentes:
+        columnas_receta = [columna['name'] for columna in inspector.get_columns('receta')]
+        migrar_tiempo_recetas(motor, columnas_receta)
+        migrar_costo_recetas(motor, columnas_receta)
+    with motor.begin() as conexion:
+        for indice in INDICES_OBSOLETOS:
+            conexion.execute("DROP INDEX IF EXISTS " + indice)
+    pendientes = []
+    for tabla in Base.metadata.sorted_tables:
+        if tabla.name not in tablas_existentes:
+            continue
+        indices_existentes = {indice['name'] for indice in inspector.get_indexes(tabla.name)}
+        for indice in tabla.indexes:
+            if indice.name in indices_existentes:
+                continue
+            try:
+                indice.create(bind=motor)
+            except IntegrityError:
+                pendientes.append(indice.name)
+    if motor.dialect.name == 'sqlite':
+        crear_busqueda_recetas(motor)
+        crear_costo_recetas(motor)
+    return pendientes
+
+
+def migrar_tiempo_recetas(motor, columnas):
+    ''' Agrega la columna tiempo_segundos a una tabla receta de una version anterior y la llena a partir del texto
+    "HH:MM:SS" de la columna tiempo. La columna tiempo se deja en la tabla pero la aplicacion ya no la usa
+    Parámetros:
+        motor: El engine de la base de datos a migrar
+        columnas (list): Los nombres de las columnas que tiene la tabla receta
+    '''
+    if 'tiempo_segundos' in columnas:
+        return
+    with motor.begin() as conexion:
+        conexion.execute("ALTER TABLE receta ADD COLUMN tiempo_segundos INTEGER")
+        if 'tiempo' in columnas:
+            # El tiempo de las recetas se validaba con el formato HH:MM:SS, por lo que cada parte ocupa dos caracteres:
+            conexion.execute("""UPDATE receta SET tiempo_segundos = CAST(substr(tiempo, 1, 2) AS INTEGER) * 3600
+                + CAST(substr(tiempo, 4, 2) AS INTEGER) * 60 + CAST(substr(tiempo, 7, 2) AS INTEGER)
+                WHERE tiempo IS NOT NULL AND tiempo != ''""")
+
+
+def migrar_costo_recetas(motor, columnas):
+    ''' Agrega la columna costo_base a una tabla receta de una version anterior y la calcula para todas las recetas
+    Parámetros:
+        motor: El engine de la base de datos a migrar
+        columnas (list): Los nombres de las columnas que tiene la tabla receta
+    '''
+    if 'costo_base' in columnas:
+        return
+    with motor.begin() as conexion:
+        conexion.execute("ALTER TABLE receta ADD COLUMN costo_base FLOAT NOT NULL DEFAULT 0")
+        conexion.execute("UPDATE receta SET costo_base = " + COSTO_RECETA.format(receta='receta.id'))
+
+
+# Costo de una receta para sus personas: suma de cantidad * valor de sus ingredientes. Con las personas de la
+# receta la cantidad escalada de dar_preparacion es la misma cantidad guardada:
+COSTO_RECETA = """(SELECT COALESCE(SUM(ingrediente_receta.cantidad * ingrediente.valor), 0)
+    FROM ingrediente_receta JOIN ingrediente ON ingrediente.id = ingrediente_receta.ingrediente_id
+    WHERE ingrediente_receta.receta_id = {receta})"""
+
+# Triggers que mantienen receta.costo_base. Cada cambio recalcula solo las recetas afectadas (sumar y restar
+# diferencias iria acumulando errores de redondeo):
+SENTENCIAS_COSTO_RECETAS = [
+    """CREATE TRIGGER receta_costo_agregar AFTER INSERT ON ingrediente_receta BEGIN
+        UPDATE receta SET costo_base = """ + COSTO_RECETA.format(receta='new.receta_id') + """
+        WHERE id = new.receta_id;
+    END""",
+    """CREATE TRIGGER receta_costo_eliminar AFTER DELETE ON ingrediente_receta BEGIN
+        UPDATE receta SET costo_base = """ + COSTO_RECETA.format(receta='old.receta_id') + """
+        WHERE id = old.receta_id;
+    END""",
+    """CREATE TRIGGER receta_costo_editar AFTER UPDATE OF ingrediente_id, receta_id, cantidad ON ingrediente_receta
+    BEGIN
+        UPDATE receta SET costo_base = """ + COSTO_RECETA.format(receta='receta.id') + """
+        WHERE id IN (old.receta_id, new.receta_id);
+    END""",
+    """CREATE TRIGGER receta_costo_valor AFTER UPDATE OF valor ON ingrediente BEGIN
+        UPDATE receta SET costo_base = """ + COSTO_RECETA.format(receta='receta.id') + """
+        WHERE id IN (SELECT receta_id FROM ingrediente_receta WHERE ingrediente_id = new.id);
+    END""",
+    """CREATE TRIGGER receta_costo_ingrediente AFTER DELETE ON ingrediente BEGIN
+        UPDATE receta SET costo_base = """ + COSTO_RECETA.format(receta='receta.id') + """
+        WHERE id IN (SELECT receta_id FROM ingrediente_receta WHERE ingrediente_id = old.id);
+    END""",
+]
+
+
+NOMBRES_TRIGGERS_COSTO = ['receta_costo_agregar', 'receta_costo_eliminar', 'receta_costo_editar',
+                          'receta_costo_valor', 'receta_costo_ingrediente']
+
+
+def crear_costo_recetas(motor):
+    ''' Crea los triggers que mantienen el costo de las recetas si todavía no existen
+    Parámetros:
+        motor: El engine de la base de datos (SQLite)
+    '''
+    with motor.begin() as conexion:
+        existentes = {fila.name for fila in conexion.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+        for nombre, sentencia in zip(NOMBRES_TRIGGERS_COSTO, SENTENCIAS_COSTO_RECETAS):
+            if nombre not in existentes:
+                conexion.execute(sentencia)
+
+
+# Índice de texto completo (FTS5) sobre el nombre y la preparación de las recetas. Es una tabla de contenido
+# externo: guarda solo el índice y los triggers lo mantienen sincronizado con la tabla receta.
+SENTENCIAS_BUSQUEDA_RECETAS = [
+    """CREATE VIRTUAL TABLE receta_fts USING fts5(
+        nombre, preparacion, content='receta', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER receta_fts_insertar AFTER INSERT ON receta BEGIN
+        INSERT INTO receta_fts(rowid, nombre, preparacion) VALUES (new.id, new.nombre, new.preparacion);
+    END""",
+    """CREATE TRIGGER receta_fts_eliminar AFTER DELETE ON receta BEGIN
+        INSERT INTO receta_fts(receta_fts, rowid, nombre, preparacion)
+        VALUES ('delete', old.id, old.nombre, old.preparacion);
+    END""",
+    """CREATE TRIGGER receta_fts_editar AFTER UPDATE OF nombre, preparacion ON receta BEGIN
+        INSERT INTO receta_fts(receta_fts, rowid, nombre, preparacion)
+        VALUES ('delete', old.id, old.nombre, old.preparacion);
+        INSERT INTO receta_fts(rowid, nombre, preparacion) VALUES (new.id, new.nombre, new.preparacion);
+    END""",
+    # Indexa las recetas que ya existían antes de crear el índice:
+    "INSERT INTO receta_fts(receta_fts) VALUES ('rebuild')",
+]
+
+
+def crear_busqueda_recetas(motor):
+    ''' Crea el índice de texto completo de las recetas si todavía no existe
+    Parámetros:
+        motor: El engine de la base de datos (SQLite)
+    Retorna:
+        (bool): True si el índice existe al terminar, False si SQLite no tiene FTS5
+    '''
+    with motor.begin() as conexion:
+        existe = conexion.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'receta_fts'").scalar()
+        if existe:
+            return True
+        try:
+            for sentencia in SENTENCIAS_BUSQUEDA_RECETAS:
+                conexion.execute(sentencia)
+        except OperationalError:
+            return False
+    return True
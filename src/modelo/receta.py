@@ -1,15 +1,68 @@
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import Column, Integer, String, Float, Index, case, func
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 
 from .declarative_base import Base
 
+
+def segundos_de_tiempo(tiempo):
+    ''' Convierte un tiempo "HH:MM:SS" en segundos
+    Parámetros:
+        tiempo (string): El tiempo con el formato que muestra y valida la interfaz
+    Retorna:
+        (int): La duración en segundos
+    '''
+    horas, minutos, segundos = tiempo.split(":")
+    return int(horas) * 3600 + int(minutos) * 60 + int(segundos)
+
+
+def formatear_tiempo(segundos):
+    ''' Convierte una duración en segundos al formato "HH:MM:SS"
+    Parámetros:
+        segundos (int o float): La duración en segundos. Las fracciones de segundo se descartan
+    Retorna:
+        (string): El tiempo con el formato que muestra la interfaz
+    '''
+    horas = int(segundos // 3600)
+    restantes = segundos % 3600
+    return '{:02d}:{:02d}:{:02d}'.format(horas, int(restantes // 60), int(restantes % 60))
+
+
 class Receta(Base):
     __tablename__ = 'receta'
+    __table_args__ = (
+        # El nombre de la receta es unico y es el criterio de orden de la lista de recetas:
+        Index('ix_receta_nombre', 'nombre', unique=True),
+        # Consultas por duracion (por ejemplo las recetas de menos de 30 minutos):
+        Index('ix_receta_tiempo_segundos', 'tiempo_segundos'),
+        # Lista de recetas ordenada por costo:
+        Index('ix_receta_costo_base', 'costo_base'),
+    )
 
     id = Column(Integer, primary_key=True)
     nombre = Column(String)
-    tiempo = Column(String)
+    # La duracion se guarda en segundos para poder ordenar y filtrar en SQL:
+    tiempo_segundos = Column(Integer)
     personas = Column(Integer)
     calorias = Column(Float)
     preparacion = Column(String)
+    # Costo de los ingredientes para las personas de la receta. Lo mantienen los triggers de migraciones.py:
+    costo_base = Column(Float, nullable=False, default=0, server_default='0')
     ingredientes = relationship('Ingrediente', secondary='ingrediente_receta')
+
+    # El tiempo como "HH:MM:SS", que es el formato que usan la interfaz, los registros y los archivos CSV:
+    @hybrid_property
+    def tiempo(self):
+        if self.tiempo_segundos is None:
+            return None
+        return formatear_tiempo(self.tiempo_segundos)
+
+    @tiempo.setter
+    def tiempo(self, tiempo):
+        self.tiempo_segundos = None if tiempo is None else segundos_de_tiempo(tiempo)
+
+    @tiempo.expression
+    def tiempo(cls):
+        formato = func.printf('%02d:%02d:%02d', cls.tiempo_segundos / 3600, cls.tiempo_segundos % 3600 / 60,
+                              cls.tiempo_segundos % 60)
+        return case([(cls.tiempo_segundos.is_(None), None)], else_=formato).label('tiempo')
@@ -0,0 +1,73 @@
+class Registro:
+    ''' Fila de solo lectura retornada por la lógica. Se puede leer como un diccionario
+    (registro['nombre']) o por atributo (registro.nombre), pero no se puede modificar ni
+    mantiene ninguna referencia a la sesión de SQLAlchemy.
+    '''
+    __slots__ = ()
+    campos = ()
+
+    def __init__(self, *valores):
+        for campo, valor in zip(self.campos, valores):
+            object.__setattr__(self, campo, valor)
+
+    @classmethod
+    def columnas(cls, modelo):
+        ''' Retorna las columnas del modelo que se deben consultar para construir el registro
+        Parámetros:
+            modelo: La clase del modelo con los mismos nombres de atributos que los campos
+        '''
+        return [getattr(modelo, campo) for campo in cls.campos]
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError("El registro es de solo lectura")
+
+    def __delattr__(self, nombre):
+        raise AttributeError("El registro es de solo lectura")
+
+    def __getitem__(self, campo):
+        if campo not in self.campos:
+            raise KeyError(campo)
+        return getattr(self, campo)
+
+    def __contains__(self, campo):
+        return campo in self.campos
+
+    def get(self, campo, defecto=None):
+        return getattr(self, campo) if campo in self.campos else defecto
+
+    def keys(self):
+        return self.campos
+
+    def valores(self):
+        return tuple(getattr(self, campo) for campo in self.campos)
+
+    def __eq__(self, otro):
+        return type(self) is type(otro) and self.valores() == otro.valores()
+
+    def __hash__(self):
+        return hash(self.valores())
+
+    def __reduce__(self):
+        return self.__class__, self.valores()
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__,
+                               ', '.join('{}={!r}'.format(campo, getattr(self, campo)) for campo in self.campos))
+
+
+class RegistroReceta(Registro):
+    __slots__ = campos = ('id', 'nombre', 'tiempo', 'personas', 'calorias', 'preparacion')
+
+
+class RegistroRecetaCosto(RegistroReceta):
+    # Receta con el costo de sus ingredientes para sus personas:
+    __slots__ = ('costo_base',)
+    campos = RegistroReceta.campos + __slots__
+
+
+class RegistroIngrediente(Registro):
+    __slots__ = campos = ('id', 'nombre', 'unidad', 'valor', 'sitioCompra')
+
+
+class RegistroIngredienteReceta(Registro):
+    __slots__ = campos = ('id', 'ingrediente_id', 'receta_id', 'cantidad')
@@ -0,0 +1,95 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, Qt, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import QApplication
+
+
+class SenalesTarea(QObject):
+    # Un QRunnable no puede emitir señales, así que la tarea usa este objeto:
+    terminada = pyqtSignal(object, object)
+    fallida = pyqtSignal(object, object)
+
+
+class TareaLogica(QRunnable):
+    # Llamado a la lógica que se ejecuta en un hilo del QThreadPool
+
+    def __init__(self, logica, funcion, argumentos, al_terminar, al_fallar):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.logica = logica
+        self.funcion = funcion
+        self.argumentos = argumentos
+        self.al_terminar = al_terminar
+        self.al_fallar = al_fallar
+        self.senales = SenalesTarea()
+
+    def run(self):
+        try:
+            resultado = self.funcion(*self.argumentos)
+        except Exception as error:
+            self.senales.fallida.emit(self, error)
+        else:
+            self.senales.terminada.emit(self, resultado)
+        finally:
+            # Cada hilo tiene su propia sesión de la base de datos; se libera al terminar cada tarea:
+            self.logica.cerrar_sesion()
+
+
+class Despachador(QObject):
+    """
+    Ejecuta los llamados a la lógica fuera del hilo de la interfaz y entrega los resultados en el hilo de la
+    interfaz. Las tareas se ejecutan una a la vez y en el orden en que se piden, de modo que una lista pedida después
+    de guardar ya incluye lo guardado. Mientras haya tareas pendientes se muestra el cursor de espera.
+    """
+
+    ocupado = pyqtSignal(bool)
+    fallo = pyqtSignal(object)
+
+    def __init__(self, logica, padre=None):
+        """
+        Constructor del despachador
+        """
+        super().__init__(padre)
+        self.logica = logica
+        self.hilos = QThreadPool(self)
+        self.hilos.setMaxThreadCount(1)
+        self.pendientes = set()
+
+    def ejecutar(self, funcion, *argumentos, al_terminar=None, al_fallar=None):
+        """
+        Esta función ejecuta funcion(*argumentos) en un hilo de trabajo. al_terminar recibe el resultado y al_fallar
+        la excepción; ambas se llaman en el hilo de la interfaz
+        """
+        tarea = TareaLogica(self.logica, funcion, argumentos, al_terminar, al_fallar)
+        tarea.senales.terminada.connect(self.terminar, Qt.QueuedConnection)
+        tarea.senales.fallida.connect(self.fallar, Qt.QueuedConnection)
+        self.pendientes.add(tarea)
+        if len(self.pendientes) == 1:
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            self.ocupado.emit(True)
+        self.hilos.start(tarea)
+        return tarea
+
+    def esperar(self, milisegundos=-1):
+        """
+        Esta función espera a que terminen las tareas que están en ejecución o en cola
+        """
+        return self.hilos.waitForDone(milisegundos)
+
+    @pyqtSlot(object, object)
+    def terminar(self, tarea, resultado):
+        self.finalizar(tarea)
+        if tarea.al_terminar is not None:
+            tarea.al_terminar(resultado)
+
+    @pyqtSlot(object, object)
+    def fallar(self, tarea, error):
+        self.finalizar(tarea)
+        if tarea.al_fallar is not None:
+            tarea.al_fallar(error)
+        else:
+            self.fallo.emit(error)
+
+    def finalizar(self, tarea):
+        self.pendientes.discard(tarea)
+        if not self.pendientes:
+            QApplication.restoreOverrideCursor()
+            self.ocupado.emit(False)
@@ -1,4 +1,7 @@
-from PyQt5.QtWidgets import QApplication
+from functools import partial
+
+from PyQt5.QtWidgets import QApplication, QMessageBox
+from .Despachador import Despachador
 from .VistaListaRecetas import VistaListaRecetas
 from .VistaReceta import VistaReceta
 from .VistaListaIngredientes import VistaListaIngredientes
@@ -20,6 +23,12 @@ class App_Recetario(QApplication):
         super(App_Recetario, self).__init__(sys_argv)
 
         self.logica = logica
+        # Los llamados a la lógica se hacen en un hilo de trabajo para que las ventanas no se congelen:
+        self.despachador = Despachador(logica, self)
+        self.despachador.fallo.connect(self.mostrar_fallo)
+        # Índice para autocompletar ingredientes. Se construye en el hilo de trabajo al abrir los ingredientes de
+        # una receta:
+        self.indice_ingredientes = None
         self.mostrar_vista_lista_recetas()
 
     def mostrar_vista_lista_recetas(self):
@@ -27,7 +36,7 @@ class App_Recetario(QApplication):
         Esta función inicializa la ventana de lista de recetas
         """
         self.vista_lista_recetas = VistaListaRecetas(self)
-        self.vista_lista_recetas.mostrar_recetas(self.logica.dar_recetas())
+        self.despachador.ejecutar(self.logica.dar_recetas, al_terminar=self.vista_lista_recetas.mostrar_recetas)
 
     def crear_receta(self):
         """
@@ -41,7 +50,7 @@ class App_Recetario(QApplication):
         """
         self.receta_actual = id_receta
         if id_receta != -1:
-            self.mostrar_ventana_receta(self.logica.dar_receta(self.receta_actual))
+            self.despachador.ejecutar(self.logica.dar_receta, self.receta_actual, al_terminar=self.mostrar_ventana_receta)
         else:
             self.mostrar_ventana_receta(None)
     
@@ -49,8 +58,8 @@ class App_Recetario(QApplication):
         """
         Esta función permite eliminar una receta
         """
-        self.logica.eliminar_receta(indice)
-        self.vista_lista_recetas.mostrar_recetas(self.logica.dar_recetas())
+        self.despachador.ejecutar(self.logica.eliminar_receta, indice)
+        self.despachador.ejecutar(self.logica.dar_recetas, al_terminar=self.vista_lista_recetas.mostrar_recetas)
 		
     def mostrar_ventana_receta(self, receta):
         """
@@ -64,63 +73,68 @@ class App_Recetario(QApplication):
         """
         Esta función permite crear una nueva receta o los cambios sobre una existente
         """
-        modo = self.logica.EVENTO_AGREGAR_RECETA if self.receta_actual == -1 else self.logica.EVENTO_EDITAR_RECETA
-        validacion = self.logica.validar_crear_editar_receta(self.receta_actual, receta, tiempo, personas, calorias, preparacion, modo)
-        if validacion == "":
-            if self.receta_actual == -1:
-                self.logica.crear_receta(receta, tiempo, personas, calorias, preparacion)
-            else:
-                self.logica.editar_receta(self.receta_actual, receta, tiempo, personas, calorias, preparacion)
-            self.vista_lista_recetas.mostrar_recetas(self.logica.dar_recetas())
-        return validacion
+        # La lógica valida una sola vez y guarda. La ventana de la receta recibe el resultado de la validación:
+        self.despachador.ejecutar(self.logica.guardar_receta, self.receta_actual, receta, tiempo, personas, calorias,
+                                  preparacion, al_terminar=self.vistaReceta.terminar_guardar,
+                                  al_fallar=self.vistaReceta.fallar_guardar)
     
     def mostrar_ingredientes(self):
         """
         Esta función muestra la ventana con la lista de ingredientes
         """
         self.vista_lista_ingredientes=VistaListaIngredientes(self)
-        self.vista_lista_ingredientes.mostrar_ingredientes(self.logica.dar_ingredientes())
+        self.despachador.ejecutar(self.logica.dar_ingredientes, al_terminar=self.vista_lista_ingredientes.mostrar_ingredientes)
 
     def crear_ingrediente(self, nombre, unidad, valor, sitioCompra):
         """
         Esta función permite crear un nuevo ingrediente
         """
-        validacion = self.logica.validar_crear_editar_ingrediente(nombre, unidad, valor, sitioCompra, "crear", -1)
-        if validacion == "":
-            self.logica.crear_ingrediente(nombre, unidad, valor, sitioCompra)
-        else:
-            self.vista_lista_ingredientes.error(validacion)
-        self.vista_lista_ingredientes.mostrar_ingredientes(self.logica.dar_ingredientes())
-        return validacion
+        vista = self.vista_lista_ingredientes
+
+        def crear():
+            validacion = self.logica.guardar_ingrediente(-1, nombre, unidad, valor, sitioCompra)
+            return validacion, self.logica.dar_ingredientes()
+
+        def terminar(resultado):
+            validacion, ingredientes = resultado
+            if validacion != "":
+                vista.error(validacion)
+            vista.mostrar_ingredientes(ingredientes)
+
+        self.despachador.ejecutar(crear, al_terminar=terminar)
 
     def editar_ingrediente(self, id, nombre, unidad, valor, sitioCompra):
         """
         Esta función permite editar un ingrediente
         """
-        validacion = self.logica.validar_crear_editar_ingrediente(nombre, unidad, valor, sitioCompra, "editar", id)
-        if validacion == "":
-            self.logica.editar_ingrediente(id, nombre, unidad, valor, sitioCompra)
-        else:
-            self.vista_lista_ingredientes.error(validacion)
+        vista = self.vista_lista_ingredientes
+        self.despachador.ejecutar(self.logica.guardar_ingrediente, id, nombre, unidad, valor, sitioCompra,
+                                  al_terminar=partial(self.mostrar_validacion, vista))
 
     def eliminar_ingrediente(self, indice):
         """
         Esta función permite eliminar un ingrediente
         """
-        resultado = self.logica.eliminar_ingrediente(indice)
-        self.vista_lista_ingredientes.mostrar_ingredientes(self.logica.dar_ingredientes(), resultado)
+        vista = self.vista_lista_ingredientes
+
+        def eliminar():
+            resultado = self.logica.eliminar_ingrediente(indice)
+            return self.logica.dar_ingredientes(), resultado
+
+        self.despachador.ejecutar(eliminar, al_terminar=lambda resultado: vista.mostrar_ingredientes(*resultado))
 
 
     def agregar_ingrediente_receta(self, receta, ingrediente, cantidad):
         """
         Esta función permite registrar un ingrediente a una receta especifica
         """
+        def agregar():
+            validacion = self.logica.validar_crear_editar_ingReceta(receta, ingrediente, cantidad, "agregar", -1)
+            if validacion == "":
+                self.logica.agregar_ingrediente_receta(receta, ingrediente, cantidad)
+            return validacion
 
-        validacion = self.logica.validar_crear_editar_ingReceta(receta, ingrediente, cantidad, "agregar", -1)
-        if validacion == "":
-            self.logica.agregar_ingrediente_receta(receta, ingrediente, cantidad)
-        else:
-            self.vista_lista_ingReceta.error(validacion)
+        self.despachador.ejecutar(agregar, al_terminar=partial(self.mostrar_validacion, self.vista_lista_ingReceta))
 
 
     
@@ -128,34 +142,80 @@ class App_Recetario(QApplication):
         """
         Esta función permite registrar un ingrediente de una receta especifica
         """
-        validacion = self.logica.validar_crear_editar_ingReceta(receta, ingrediente, cantidad, "editar", id_ingrediente_receta)
-        if validacion == "":
-            self.logica.editar_ingrediente_receta(id_ingrediente_receta,receta, ingrediente, cantidad)
-        else:
-            self.vista_lista_ingReceta.error(validacion)
+        def editar():
+            validacion = self.logica.validar_crear_editar_ingReceta(receta, ingrediente, cantidad, "editar", id_ingrediente_receta)
+            if validacion == "":
+                self.logica.editar_ingrediente_receta(id_ingrediente_receta,receta, ingrediente, cantidad)
+            return validacion
+
+        self.despachador.ejecutar(editar, al_terminar=partial(self.mostrar_validacion, self.vista_lista_ingReceta))
 
 			
     def eliminar_ingrediente_receta(self, indice, receta):
         """
         Esta función permite eliminar un ingrediente de una receta especifica
         """
-        self.logica.eliminar_ingrediente_receta(indice, receta)
+        self.despachador.ejecutar(self.logica.eliminar_ingrediente_receta, indice, receta)
 		
 
     def mostrar_ingredientes_receta(self, receta):
         """
         Esta función muestra la ventana con la lista de ingredientes de una receta
         """
-        ingredientes = self.logica.dar_ingredientes()
-        self.vista_lista_ingReceta = VistaListaIngredientesReceta(self, receta, ingredientes)
-        self.vista_lista_ingReceta.mostrar_ing_receta(self.logica.dar_ingredientes_receta(self.receta_actual))
+        id_receta = self.receta_actual
+
+        def consultar():
+            # El índice se construye aquí y no con la primera tecla en el hilo de la interfaz; sus ingredientes
+            # son la lista que muestra el diálogo:
+            return self.logica.dar_indice_ingredientes(), self.logica.dar_ingredientes_receta(id_receta)
+
+        def terminar(resultado):
+            self.indice_ingredientes, ingredientes_receta = resultado
+            self.vista_lista_ingReceta = VistaListaIngredientesReceta(self, receta,
+                                                                      self.indice_ingredientes.ingredientes)
+            self.vista_lista_ingReceta.mostrar_ing_receta(ingredientes_receta)
 
+        self.despachador.ejecutar(consultar, al_terminar=terminar)
+
+
+    def completar_ingredientes(self, prefijo):
+        """
+        Esta función retorna los ingredientes sugeridos para el texto que el usuario está escribiendo. Se llama
+        directamente porque solo usa el índice en memoria, que no consulta la base de datos
+        """
+        if self.indice_ingredientes is None:
+            return []
+        return [ingrediente for posicion, ingrediente in self.indice_ingredientes.sugerir(prefijo)]
 
     def mostrar_preparacion(self, id_receta, cantidad_personas):
         """
         Esta función muestra la preparacieon de una receta para un número de personas
         """
-        self.datos_preparacion = self.logica.dar_preparacion(id_receta, cantidad_personas)
+        self.despachador.ejecutar(self.logica.dar_preparacion, id_receta, cantidad_personas,
+                                  al_terminar=self.mostrar_ventana_preparacion)
+
+    def mostrar_ventana_preparacion(self, datos_preparacion):
+        """
+        Esta función muestra la ventana con la preparación calculada
+        """
+        self.datos_preparacion = datos_preparacion
         self.vista_reporte = VistaPreparacion( self, self.datos_preparacion['receta'])
         self.vista_reporte.mostrar_datos(self.datos_preparacion)
 
+    def mostrar_validacion(self, vista, validacion):
+        """
+        Esta función muestra en la vista el error de validación de un cambio, si lo hubo
+        """
+        if validacion != "":
+            vista.error(validacion)
+
+    def mostrar_fallo(self, error):
+        """
+        Esta función informa los errores inesperados de los llamados a la lógica
+        """
+        mensaje_error = QMessageBox()
+        mensaje_error.setIcon(QMessageBox.Critical)
+        mensaje_error.setText("Error: " + str(error))
+        mensaje_error.setWindowTitle("Error")
+        mensaje_error.exec_()
+
@@ -16,6 +16,8 @@ class VistaCrearIngReceta(QDialog):
 
         self.interfaz = interfaz
         self.ingredientes = ingredientes
+        # Las sugerencias se identifican por el id del ingrediente y se ubican en la lista de este diálogo:
+        self.posiciones_ingredientes = {ingrediente["id"]: posicion for posicion, ingrediente in enumerate(ingredientes)}
 
         self.setFixedSize(400, 300)
         self.setWindowIcon(QIcon("src/recursos/RecetarioLogo.png"))
@@ -42,10 +44,22 @@ class VistaCrearIngReceta(QDialog):
         etiqueta_ingrediente = QLabel("Ingrediente")
         distribuidor_dialogo.addWidget(etiqueta_ingrediente, numero_fila, 0)
 
+        # El combobox usa un modelo con todos los nombres, que se llena de una vez en lugar de agregar uno por uno.
+        # Es editable para poder escribir el nombre y las sugerencias se piden a la interfaz en cada tecla
         self.combobox_ingredientes = QComboBox(self)
-        for ingrediente in self.ingredientes:
-            self.combobox_ingredientes.addItem(ingrediente["nombre"] + "[" + ingrediente["unidad"]+"]")
+        self.combobox_ingredientes.setModel(QtCore.QStringListModel([ingrediente["nombre"] + "[" + ingrediente["unidad"]+"]" for ingrediente in self.ingredientes], self))
+        self.combobox_ingredientes.setEditable(True)
+        self.combobox_ingredientes.setInsertPolicy(QComboBox.NoInsert)
         self.combobox_ingredientes.setCurrentIndex(0)
+
+        self.posiciones_sugeridas = []
+        self.modelo_sugerencias = QtCore.QStringListModel(self)
+        self.completador = QCompleter(self.modelo_sugerencias, self)
+        # El filtrado lo hace la lógica (sin tildes, por palabra y con errores de digitación), no el QCompleter
+        self.completador.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completador.activated[QtCore.QModelIndex].connect(self.seleccionar_sugerencia)
+        self.combobox_ingredientes.setCompleter(self.completador)
+        self.combobox_ingredientes.lineEdit().textEdited.connect(self.sugerir_ingredientes)
         distribuidor_dialogo.addWidget(self.combobox_ingredientes, numero_fila, 1, 1, 2)
         numero_fila = numero_fila + 1
 
@@ -80,10 +94,46 @@ class VistaCrearIngReceta(QDialog):
             self.combobox_ingredientes.setCurrentIndex(indice_ingrediente_receta)
             self.texto_cantidad.setText(str(ingredienteReceta["cantidad"]))
 
+    def sugerir_ingredientes(self, texto):
+        """
+        Esta función actualiza las sugerencias con los ingredientes que corresponden al texto escrito
+        """
+        sugerencias = [ingrediente for ingrediente in self.interfaz.completar_ingredientes(texto)
+                       if ingrediente["id"] in self.posiciones_ingredientes]
+        self.posiciones_sugeridas = [self.posiciones_ingredientes[ingrediente["id"]] for ingrediente in sugerencias]
+        self.modelo_sugerencias.setStringList([ingrediente["nombre"] + "[" + ingrediente["unidad"]+"]" for ingrediente in sugerencias])
+        self.completador.complete()
+
+    def seleccionar_sugerencia(self, indice):
+        """
+        Esta función selecciona en el combobox el ingrediente sugerido que escogió el usuario
+        """
+        self.combobox_ingredientes.setCurrentIndex(self.posiciones_sugeridas[indice.row()])
+
+    def ingrediente_seleccionado(self):
+        """
+        Esta función retorna el ingrediente cuyo nombre está escrito en el combobox, o None si el texto no
+        corresponde a ningún ingrediente
+        """
+        posicion = self.combobox_ingredientes.findText(self.combobox_ingredientes.currentText(), QtCore.Qt.MatchExactly)
+        if posicion == -1:
+            return None
+        return self.ingredientes[posicion]
+
     def guardar(self):
         """
         Esta función envía la información de la solicitud de guardar los cambios
         """
+        # El combobox es editable: un texto que no es de ningún ingrediente no se guarda con el último seleccionado
+        if self.ingrediente_seleccionado() is None:
+            mensaje_error = QMessageBox()
+            mensaje_error.setIcon(QMessageBox.Question)
+            mensaje_error.setText("Error : Seleccione un ingrediente de la lista")
+            mensaje_error.setWindowTitle("Error ingrediente de receta")
+            mensaje_error.setWindowIcon(QIcon("src/recursos/RecetarioLogo.png"))
+            mensaje_error.setStandardButtons(QMessageBox.Ok)
+            mensaje_error.exec_()
+            return self.resultado
         self.resultado = 1
         self.close()
         return self.resultado
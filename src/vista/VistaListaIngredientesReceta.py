@@ -157,7 +157,7 @@ class VistaListaIngredientesReceta(QWidget):
         dialogo=VistaCrearIngReceta(None, self.interfaz, self.ingredientes)
         dialogo.exec_()
         if dialogo.resultado==1:
-            self.interfaz.agregar_ingrediente_receta(self.receta,self.ingredientes[dialogo.combobox_ingredientes.currentIndex()],dialogo.texto_cantidad.text())
+            self.interfaz.agregar_ingrediente_receta(self.receta,dialogo.ingrediente_seleccionado(),dialogo.texto_cantidad.text())
             self.hide()
             self.interfaz.mostrar_ingredientes_receta(self.receta)
             
@@ -169,7 +169,7 @@ class VistaListaIngredientesReceta(QWidget):
         dialogo=VistaCrearIngReceta(self.lista_ings_receta[id_ingrediente_receta], self.interfaz, self.ingredientes)
         dialogo.exec_()
         if dialogo.resultado==1:            
-            self.interfaz.editar_ingrediente_receta(id_ingrediente_receta,self.receta, self.ingredientes[dialogo.combobox_ingredientes.currentIndex()], dialogo.texto_cantidad.text())
+            self.interfaz.editar_ingrediente_receta(id_ingrediente_receta,self.receta, dialogo.ingrediente_seleccionado(), dialogo.texto_cantidad.text())
             self.hide()
             self.interfaz.mostrar_ingredientes_receta(self.receta)
 
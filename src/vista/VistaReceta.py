@@ -125,15 +125,30 @@ class VistaReceta(QWidget):
         """
         Esta función guarda los cambios de una receta
         """
-        resultado = self.interfaz.guardar_receta(self.texto_nombre_receta.text(), self.texto_tiempo_preparacion.text(),
-                                                  self.texto_personas.text(), self.texto_calorias.text(),
-                                                  self.texto_preparacion.toPlainText())
+        # Se evita guardar dos veces mientras la interfaz guarda en segundo plano:
+        self.btn_guardar_receta.setEnabled(False)
+        self.interfaz.guardar_receta(self.texto_nombre_receta.text(), self.texto_tiempo_preparacion.text(),
+                                     self.texto_personas.text(), self.texto_calorias.text(),
+                                     self.texto_preparacion.toPlainText())
+
+    def terminar_guardar(self, resultado):
+        """
+        Esta función recibe el resultado de guardar la receta
+        """
+        self.btn_guardar_receta.setEnabled(True)
         if resultado == "":
             self.hide()
             self.interfaz.mostrar_vista_lista_recetas()
         else:
             self.error_id(resultado)
 
+    def fallar_guardar(self, error):
+        """
+        Esta función recibe el error inesperado al guardar la receta y deja guardar de nuevo
+        """
+        self.btn_guardar_receta.setEnabled(True)
+        self.interfaz.mostrar_fallo(error)
+
     def mostrar_ventana_ingredientes_receta(self):
         """
         Esta función informa a la interfaz para desplegar la ventana de lista de ingredientes de la receta
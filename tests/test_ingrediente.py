@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from faker import Faker
@@ -5,7 +6,7 @@ from sqlalchemy import func
 import random
 
 from src.modelo.ingrediente import Ingrediente
-from src.modelo.declarative_base import Session, Base
+from src.modelo.declarative_base import Session, Base, contar_sentencias
 from src.logica.LogicaRecetario import LogicaRecetario
 from src.modelo.receta import Receta
 
@@ -107,13 +108,39 @@ class IngredienteTestCase(unittest.TestCase):
         self.LogicaRecetario.crear_ingrediente(nombre_ingrediente, unidad, valor, sitioCompra)
         ingrediente = self.session.query(Ingrediente).filter(Ingrediente.nombre == nombre_ingrediente,
                                                              Ingrediente.unidad == unidad).first()
-        id = ingrediente.id
+        # Las ediciones usan la posicion en la lista de ingredientes:
+        id = [fila['id'] for fila in self.LogicaRecetario.dar_ingredientes()].index(ingrediente.id)
         nuevo_nombre = self.data_factory.unique.word()
         self.LogicaRecetario.editar_ingrediente(id, nuevo_nombre, unidad, valor, sitioCompra)
         consulta = self.LogicaRecetario.dar_ingrediente(id)
         self.assertNotEqual(consulta['nombre'], nombre_ingrediente)
         self.assertEqual(consulta['nombre'], nuevo_nombre)
 
+    def test_editar_ingrediente_una_sentencia(self):
+        self.LogicaRecetario.crear_ingrediente("Papa", "kg", 2000, "Plaza")
+        self.LogicaRecetario.crear_ingrediente("Yuca", "kg", 3000, "Plaza")
+        self.LogicaRecetario.dar_ingredientes()
+
+        with contar_sentencias() as sentencias:
+            editado = self.LogicaRecetario.editar_ingrediente(0, "Papa criolla", "kg", 2500, "Tienda")
+        # Con la lista en cache la edicion es un solo UPDATE por id:
+        self.assertTrue(editado)
+        self.assertEqual(len(sentencias), 1)
+        self.assertTrue(sentencias[0].startswith("UPDATE ingrediente"))
+        ingrediente = self.session.query(Ingrediente).filter(Ingrediente.nombre == "Papa criolla").one()
+        self.assertEqual((ingrediente.valor, ingrediente.sitioCompra), (2500, "Tienda"))
+
+        # Otro ingrediente con el mismo nombre y unidad impide la edicion; la causa se consulta despues del UPDATE:
+        self.LogicaRecetario.dar_ingredientes()
+        with contar_sentencias() as sentencias:
+            self.assertEqual(self.LogicaRecetario.guardar_ingrediente(0, "Yuca", "kg", 2500, "Tienda"),
+                             "Ya existe un ingrediente con el nombre 'Yuca' y la unidad 'kg'")
+        self.assertEqual([sentencia.split()[0] for sentencia in sentencias], ["UPDATE", "SELECT"])
+        self.assertEqual(self.LogicaRecetario.guardar_ingrediente(5, "Yuca", "lb", 2500, "Tienda"),
+                         "El ingrediente que se quiere editar no existe")
+        self.assertEqual(self.session.query(Ingrediente).filter(Ingrediente.nombre == "Yuca").count(), 1)
+        self.assertTrue(self.LogicaRecetario.editar_ingrediente(0, "Papa criolla", "lb", 1200, "Tienda"))
+
     def test_editar_ingrediente_con_valores_vacios(self):
         nombre_ingrediente = self.data_factory.unique.word()
         unidad = self.data_factory.unique.word()
@@ -161,14 +188,14 @@ class IngredienteTestCase(unittest.TestCase):
                                                              Ingrediente.unidad == unidad,
                                                              Ingrediente.valor == valor,
                                                              Ingrediente.sitioCompra == sitioCompra).first()
-        id_ingrediente = ingrediente.id
+        id_bd = ingrediente.id
 
-        # 2. Ejecutar la acción donde se va a eliminar el ingrediente:
+        # 2. Ejecutar la acción donde se va a eliminar el ingrediente (por su posicion en la lista):
         resultado = self.LogicaRecetario.eliminar_ingrediente(id_ingrediente)
         self.assertEqual(resultado, True)
 
         # 3. Verificar el resultado
-        ingrediente_eliminado = self.session.query(Ingrediente).filter_by(id=id_ingrediente).first()
+        ingrediente_eliminado = self.session.query(Ingrediente).filter_by(id=id_bd).first()
         self.assertIsNone(ingrediente_eliminado, "El ingrediente no ha sido eliminado correctamente")
 
     def test_eliminar_ingrediente_inexistente(self):
@@ -250,4 +277,124 @@ class IngredienteTestCase(unittest.TestCase):
         ingrediente_eliminado = self.session.query(Ingrediente).filter_by(id=id_ingrediente).first()
         self.assertIsNotNone(ingrediente_eliminado, "El ingrediente se elimino pero no debería ser eliminado")
 
+    def test_dar_recetas_ingrediente(self):
+        self.LogicaRecetario.crear_receta("Ajiaco", "01:30:00", 4, 250, self.data_factory.sentence())
+        self.LogicaRecetario.crear_receta("Arepa", "00:20:00", 2, 150, self.data_factory.sentence())
+        self.LogicaRecetario.crear_ingrediente("Arroz", "kg", 1000, "Tienda")
+        self.LogicaRecetario.crear_ingrediente("Papa", "kg", 500, "Plaza")
+        arroz, papa = self.LogicaRecetario.dar_ingredientes()
+        self.LogicaRecetario.agregar_ingrediente_receta({"nombre": "Arepa"}, papa, 1)
+        self.LogicaRecetario.agregar_ingrediente_receta({"nombre": "Ajiaco"}, papa, 6)
+
+        self.assertEqual([(uso["receta"], uso["cantidad"]) for uso in self.LogicaRecetario.dar_recetas_ingrediente(1)],
+                         [("Ajiaco", 6), ("Arepa", 1)])
+        self.assertEqual(self.LogicaRecetario.contar_usos_ingrediente(1), 2)
+        self.assertEqual(self.LogicaRecetario.dar_recetas_ingrediente(0), [])
+        self.assertEqual(self.LogicaRecetario.contar_usos_ingrediente(0), 0)
+
+        # Solo se puede eliminar el ingrediente que no se usa:
+        self.assertFalse(self.LogicaRecetario.eliminar_ingrediente(1))
+        self.assertTrue(self.LogicaRecetario.eliminar_ingrediente(0))
+        self.assertEqual([ingrediente["nombre"] for ingrediente in self.LogicaRecetario.dar_ingredientes()], ["Papa"])
+
+    def test_validar_ingredientes(self):
+        self.LogicaRecetario.crear_ingrediente("Arroz", "kg", 1000, "Tienda")
+        self.LogicaRecetario.crear_ingrediente("Papa", "kg", 500, "Plaza")
+        ingredientes = [{"nombre": "Papa", "unidad": "lb", "valor": "250", "sitioCompra": "Plaza"},
+                        {"nombre": "Papa", "unidad": "kg", "valor": "500", "sitioCompra": "Plaza"},
+                        {"nombre": "Papa", "unidad": "lb", "valor": "260", "sitioCompra": "Plaza"},
+                        {"nombre": "Sal", "unidad": "g", "valor": "gratis", "sitioCompra": "Tienda"},
+                        {"nombre": "Sal", "unidad": "", "valor": "10", "sitioCompra": "Tienda"},
+                        {"id_ingrediente": 1, "nombre": "Papa", "unidad": "kg", "valor": "450", "sitioCompra": "Plaza"},
+                        {"id_ingrediente": 1, "nombre": "Arroz", "unidad": "kg", "valor": "450", "sitioCompra": "Plaza"},
+                        {"id_ingrediente": 2, "nombre": "Papa", "unidad": "kg", "valor": "450", "sitioCompra": "Plaza"},
+                        {"id_ingrediente": -1, "nombre": "Yuca", "unidad": "kg", "valor": "450", "sitioCompra": "Plaza"}]
+
+        self.assertEqual(self.LogicaRecetario.validar_ingredientes(ingredientes),
+                         ["", "Ya existe un ingrediente con el nombre 'Papa' y la unidad 'kg'",
+                          "Ya existe un ingrediente con el nombre 'Papa' y la unidad 'lb'",
+                          "El valor de la unidad debe ser un número",
+                          "La unidad del ingrediente no puede estar vacio", "",
+                          "Ya existe un ingrediente con el nombre 'Arroz' y la unidad 'kg'",
+                          "El ingrediente que se quiere editar no existe",
+                          "El ingrediente que se quiere editar no existe"])
+
+    def test_dar_ingredientes_pagina(self):
+        nombre_repetido = self.data_factory.unique.word()
+        for i in range(6):
+            # Algunos ingredientes comparten nombre para probar el desempate por unidad:
+            nombre_ingrediente = nombre_repetido if i % 2 == 0 else self.data_factory.unique.word()
+            self.LogicaRecetario.crear_ingrediente(nombre_ingrediente, self.data_factory.unique.word(),
+                                                   self.data_factory.pyfloat(min_value=1, max_value=1000),
+                                                   self.data_factory.city())
+
+        ingredientes_paginados = []
+        pagina, cursor = self.LogicaRecetario.dar_ingredientes_pagina(4)
+        ingredientes_paginados.extend(pagina)
+        self.assertEqual(len(pagina), 4)
+        while cursor is not None:
+            pagina, cursor = self.LogicaRecetario.dar_ingredientes_pagina(4, cursor)
+            ingredientes_paginados.extend(pagina)
+
+        self.assertEqual(ingredientes_paginados, self.LogicaRecetario.dar_ingredientes())
+
+    def test_dar_ingredientes_pagina_tamano_invalido(self):
+        for tamano_pagina in [0, -1]:
+            with self.assertRaises(ValueError):
+                self.LogicaRecetario.dar_ingredientes_pagina(tamano_pagina)
+
+    def test_importar_ingredientes_csv(self):
+        nombre_existente = self.data_factory.unique.word()
+        self.LogicaRecetario.crear_ingrediente(nombre_existente, "kg", 1000, "Plaza")
+
+        nombre_1 = self.data_factory.unique.word()
+        nombre_2 = self.data_factory.unique.word()
+        archivo = io.StringIO(
+            "nombre,unidad,valor,sitioCompra\n"
+            f"{nombre_1},kg,2500,Plaza\n"
+            f"{nombre_2},lb,1200.5,Tienda\n"
+            f"{nombre_existente},kg,900,Plaza\n"
+            f"{nombre_1},kg,2600,Plaza\n"
+            f"{self.data_factory.unique.word()},g,gratis,Tienda\n")
+
+        resumen = self.LogicaRecetario.importar_ingredientes_csv(archivo, tamano_lote=2)
+
+        self.assertEqual(resumen["importados"], 2)
+        self.assertEqual([rechazo["linea"] for rechazo in resumen["rechazados"]], [4, 5, 6])
+        self.assertEqual(resumen["rechazados"][0]["mensaje"],
+                         f"Ya existe un ingrediente con el nombre '{nombre_existente}' y la unidad 'kg'")
+        self.assertEqual(resumen["rechazados"][2]["mensaje"], "El valor de la unidad debe ser un número")
+        nombres = [ingrediente["nombre"] for ingrediente in self.LogicaRecetario.dar_ingredientes()]
+        self.assertEqual(nombres.count(nombre_1), 1)
+        self.assertIn(nombre_2, nombres)
+
+    def test_completar_ingredientes(self):
+        self.LogicaRecetario.crear_ingrediente("Azúcar morena", "kg", 4000, "Tienda")
+        self.LogicaRecetario.crear_ingrediente("Papa criolla", "kg", 3000, "Plaza")
+        self.LogicaRecetario.crear_ingrediente("Papa pastusa", "kg", 2000, "Plaza")
+        ingredientes = self.LogicaRecetario.dar_ingredientes()
+
+        def nombres(sugerencias):
+            self.assertEqual([ingredientes[posicion] for posicion, ingrediente in sugerencias],
+                             [ingrediente for posicion, ingrediente in sugerencias])
+            return [ingrediente["nombre"] for posicion, ingrediente in sugerencias]
 
+        self.assertEqual(nombres(self.LogicaRecetario.completar_ingredientes("azuc")), ["Azúcar morena"])
+        self.assertEqual(nombres(self.LogicaRecetario.completar_ingredientes("PAPA")), ["Papa criolla", "Papa pastusa"])
+        self.assertEqual(nombres(self.LogicaRecetario.completar_ingredientes("crio")), ["Papa criolla"])
+        self.assertEqual(nombres(self.LogicaRecetario.completar_ingredientes("pastsa")), ["Papa pastusa"])
+        self.assertEqual(self.LogicaRecetario.completar_ingredientes("pastsa", aproximado=False), [])
+        self.assertEqual(self.LogicaRecetario.completar_ingredientes(""), [])
+
+        self.LogicaRecetario.crear_ingrediente("Panela", "kg", 5000, "Tienda")
+        ingredientes = self.LogicaRecetario.dar_ingredientes()
+        self.assertEqual(nombres(self.LogicaRecetario.completar_ingredientes("pane")), ["Panela"])
+
+        # El indice se puede pedir una vez (en un hilo de trabajo) y consultar despues sin la logica ni la base:
+        indice = self.LogicaRecetario.dar_indice_ingredientes()
+        self.assertIs(self.LogicaRecetario.dar_indice_ingredientes(), indice)
+        with contar_sentencias() as sentencias:
+            sugerencias = indice.sugerir("pap")
+        self.assertEqual(sentencias, [])
+        self.assertEqual([indice.ingredientes[posicion] for posicion, ingrediente in sugerencias],
+                         [ingrediente for posicion, ingrediente in sugerencias])
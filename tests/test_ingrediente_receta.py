@@ -6,7 +6,8 @@ import random
 from src.modelo.ingrediente import Ingrediente
 from src.modelo.ingrediente import IngredienteReceta
 from src.modelo.receta import Receta
-from src.modelo.declarative_base import Session, Base
+
+from src.modelo.declarative_base import Session, Base, contar_sentencias
 from src.logica.LogicaRecetario import LogicaRecetario
 
 
@@ -301,4 +302,69 @@ class IngredienteRecetaTestCase(unittest.TestCase):
         self.assertNotEqual(consulta2['ingrediente_id'], ingrediente1.id)
         self.assertEqual(consulta2['ingrediente_id'], ingrediente2.id)
 
+    def test_dar_ingredientes_receta_numero_consultas_constante(self):
+        self.LogicaRecetario.crear_receta(self.data_factory.unique.word(), "00:30:00", 4, 250,
+                                          self.data_factory.sentence())
+        receta = self.session.query(Receta).order_by(Receta.id.desc()).first()
 
+        for i in range(20):
+            self.LogicaRecetario.crear_ingrediente(self.data_factory.unique.word(), self.data_factory.unique.word(),
+                                                   self.data_factory.pyfloat(min_value=1, max_value=1000),
+                                                   self.data_factory.city())
+            ingrediente = self.session.query(Ingrediente).order_by(Ingrediente.id.desc()).first()
+            self.LogicaRecetario.agregar_ingrediente_receta(receta.__dict__, ingrediente.__dict__,
+                                                            random.randint(1, 100))
+
+        with contar_sentencias() as sentencias:
+            ingredientes_receta = self.LogicaRecetario.dar_ingredientes_receta(0)
+
+        self.assertEqual(len(ingredientes_receta), 20)
+        # Mapa de posiciones de recetas + consulta de los ingredientes con su cantidad:
+        self.assertLessEqual(len(sentencias), 2)
+
+    def test_eliminar_ingrediente_receta(self):
+        self.LogicaRecetario.crear_receta("Ajiaco", "01:30:00", 4, 250, "Cocinar las papas")
+        for nombre in ["Papa", "Guasca", "Pollo"]:
+            self.LogicaRecetario.crear_ingrediente(nombre, "kg", 1000, "Plaza")
+        receta = self.LogicaRecetario.dar_receta(0)
+        for ingrediente in self.LogicaRecetario.dar_ingredientes():
+            self.LogicaRecetario.agregar_ingrediente_receta(receta, ingrediente, 2)
+
+        # La posicion es la de dar_ingredientes_receta (Guasca, Papa, Pollo) y se borra con un solo DELETE:
+        with contar_sentencias() as sentencias:
+            self.assertTrue(self.LogicaRecetario.eliminar_ingrediente_receta(1, receta))
+        self.assertEqual([sentencia.split()[0] for sentencia in sentencias], ["DELETE"])
+        self.assertEqual([fila['ingrediente'] for fila in self.LogicaRecetario.dar_ingredientes_receta(0)],
+                         ["Guasca", "Pollo"])
+        self.assertEqual(self.session.query(Ingrediente).count(), 3)
+
+        # Una posicion que no existe no borra nada:
+        self.assertFalse(self.LogicaRecetario.eliminar_ingrediente_receta(2, receta))
+        self.assertEqual(self.session.query(IngredienteReceta).count(), 2)
+
+    def test_validar_ingredientes_receta(self):
+        self.LogicaRecetario.crear_receta("Ajiaco", "01:30:00", 4, 250, self.data_factory.sentence())
+        self.LogicaRecetario.crear_ingrediente("Papa", "kg", 500, "Plaza")
+        self.LogicaRecetario.crear_ingrediente("Arroz", "kg", 1000, "Tienda")
+        self.LogicaRecetario.agregar_ingrediente_receta({"nombre": "Ajiaco"}, {"nombre": "Papa", "unidad": "kg"}, 3)
+
+        filas = [{"receta": "Ajiaco", "ingrediente": "Arroz", "unidad": "kg", "cantidad": "2"},
+                 {"receta": "Ajiaco", "ingrediente": "Papa", "unidad": "kg", "cantidad": 1},
+                 {"receta": "Ajiaco", "ingrediente": "Arroz", "unidad": "kg", "cantidad": 1},
+                 {"receta": "Ajiaco", "ingrediente": "Arroz", "unidad": "kg", "cantidad": "dos"},
+                 {"receta": "Ajiaco", "ingrediente": "Arroz", "unidad": "kg", "cantidad": 0},
+                 {"receta": "Sancocho", "ingrediente": "Papa", "unidad": "kg", "cantidad": 1},
+                 {"receta": "Ajiaco", "ingrediente": "Papa", "unidad": "lb", "cantidad": 1}]
+
+        self.assertEqual(self.LogicaRecetario.validar_ingredientes_receta(filas),
+                         ["",
+                          "El ingrediente Papa ya está asociado a la receta Ajiaco",
+                          "El ingrediente Arroz ya está asociado a la receta Ajiaco",
+                          "La cantidad debe ser un número",
+                          "La cantidad debe ser un número positivo.",
+                          "No existe una receta con el nombre 'Sancocho'",
+                          "No existe un ingrediente con el nombre 'Papa' y la unidad 'lb'"])
+        # Los mensajes son los mismos de la validación de un solo ingrediente:
+        self.assertEqual(self.LogicaRecetario.validar_crear_editar_ingReceta(
+            {"nombre": "Ajiaco"}, {"nombre": "Papa", "unidad": "kg"}, 1, "agregar", -1),
+            "El ingrediente Papa ya está asociado a la receta Ajiaco")
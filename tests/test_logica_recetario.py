@@ -1,6 +1,13 @@
+import asyncio
+import threading
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
+from src.logica.AsyncLogicaRecetario import AsyncLogicaRecetario
+from src.logica.FachadaRecetario import FachadaRecetario
 from src.logica.LogicaRecetario import LogicaRecetario
+from src.modelo.declarative_base import Session, Base, session
+
 
 class LogicaRecetarioTestCase(unittest.TestCase):
 
@@ -9,9 +16,144 @@ class LogicaRecetarioTestCase(unittest.TestCase):
         
     def tearDown(self):
         self.logica = None
+        sesion = Session()
+        for table in reversed(Base.metadata.sorted_tables):
+            sesion.execute(table.delete())
+        sesion.commit()
+        sesion.close()
         
     # def test_dar_receta(self):
     #     receta = self.logica.recetas[0]
     #     self.assertEqual(receta["nombre"], "Ajiaco")
 
+    def test_sesion_por_hilo(self):
+        sesion_principal = session()
+
+        def sesion_propia():
+            try:
+                self.logica.dar_recetas()
+                return session() is not sesion_principal
+            finally:
+                self.logica.cerrar_sesion()
+
+        with ThreadPoolExecutor(max_workers=2) as ejecutor:
+            resultados = list(ejecutor.map(lambda i: sesion_propia(), range(4)))
+
+        self.assertTrue(all(resultados))
+
+    def test_crear_recetas_desde_varios_hilos(self):
+        nombres = ["Receta {}".format(i) for i in range(8)]
+
+        def crear(nombre):
+            try:
+                return self.logica.crear_receta(nombre, "00:30:00", 4, 200, "Mezclar todo")
+            finally:
+                self.logica.cerrar_sesion()
+
+        with ThreadPoolExecutor(max_workers=4) as ejecutor:
+            resultados = list(ejecutor.map(crear, nombres))
+
+        self.assertTrue(all(resultados))
+        self.assertEqual([receta["nombre"] for receta in self.logica.dar_recetas()], nombres)
+
+    def test_logica_asincrona(self):
+        async def usar_logica():
+            async with AsyncLogicaRecetario(self.logica, max_hilos=3) as logica:
+                creadas = await asyncio.gather(*[logica.crear_receta("Receta {}".format(i), "00:30:00", 4, 200,
+                                                                     "Mezclar todo") for i in range(3)])
+                self.assertTrue(all(creadas))
+                await logica.crear_ingrediente("Papa criolla", "kg", 3000, "Plaza")
+                return await asyncio.gather(logica.dar_recetas(), logica.dar_ingredientes(),
+                                            logica.buscar_recetas("mezclar"), logica.dar_preparacion(0, 8))
+
+        recetas, ingredientes, encontradas, preparacion = asyncio.run(usar_logica())
+
+        self.assertEqual([receta["nombre"] for receta in recetas], ["Receta 0", "Receta 1", "Receta 2"])
+        self.assertEqual(ingredientes, self.logica.dar_ingredientes())
+        self.assertEqual(len(encontradas), 3)
+        self.assertEqual(preparacion["tiempo_preparacion"], "00:40:00")
+
+    def test_logica_asincrona_con_otra_fachada(self):
+        # Los hilos de trabajo llaman cerrar_sesion de la fachada, que por defecto no hace nada:
+        class RecetarioFijo(FachadaRecetario):
+            def dar_recetas(self):
+                return [{"nombre": "Ajiaco"}]
+
+        async def usar_logica():
+            async with AsyncLogicaRecetario(RecetarioFijo(), max_hilos=1) as logica:
+                return await logica.dar_recetas()
+
+        self.assertEqual(asyncio.run(usar_logica()), [{"nombre": "Ajiaco"}])
+
+    def test_logica_asincrona_cerrar_sin_bloquear(self):
+        # Mientras se esperan los llamados pendientes al cerrar, el loop sigue atendiendo otras corrutinas:
+        liberar = threading.Event()
+        marcas = []
+
+        async def usar_logica():
+            logica = AsyncLogicaRecetario(self.logica, max_hilos=1)
+            pendiente = asyncio.get_running_loop().run_in_executor(logica.ejecutor, liberar.wait, 5)
+
+            async def marcar():
+                marcas.append("loop libre")
+                liberar.set()
+
+            await asyncio.gather(logica.__aexit__(None, None, None), marcar())
+            # Si el cierre bloqueara el loop, marcar no correria y la espera terminaria por tiempo (False):
+            return await pendiente
+
+        self.assertTrue(asyncio.run(usar_logica()))
+        self.assertEqual(marcas, ["loop libre"])
+
+    def test_cache_recetas_e_ingredientes(self):
+        self.logica.crear_receta("Ajiaco", "01:00:00", 4, 500, "Cocinar las papas")
+        self.logica.crear_ingrediente("Papa criolla", "kg", 3000, "Plaza")
+
+        self.logica.dar_recetas()
+        self.logica.dar_recetas()
+        self.logica.dar_ingredientes()
+        self.logica.dar_ingredientes()
+        self.assertEqual(self.logica.dar_estadisticas_cache(), {'aciertos': 2, 'fallos': 2})
+
+        # Crear una receta invalida solo la lista de recetas:
+        self.logica.crear_receta("Bandeja paisa", "02:00:00", 2, 1500, "Freir el chicharron")
+        self.assertEqual([receta["nombre"] for receta in self.logica.dar_recetas()], ["Ajiaco", "Bandeja paisa"])
+        self.logica.dar_ingredientes()
+        self.assertEqual(self.logica.dar_estadisticas_cache(), {'aciertos': 3, 'fallos': 3})
+
+        # Editar un ingrediente invalida solo la lista de ingredientes:
+        self.logica.editar_ingrediente(0, "Papa pastusa", "kg", 2500, "Plaza")
+        self.assertEqual(self.logica.dar_ingredientes()[0]["nombre"], "Papa pastusa")
+        estadisticas = self.logica.dar_estadisticas_cache()
+        self.logica.dar_recetas()
+        self.assertEqual(self.logica.dar_estadisticas_cache()['fallos'], estadisticas['fallos'])
+        self.assertEqual(self.logica.dar_estadisticas_cache()['aciertos'], estadisticas['aciertos'] + 1)
+
+    def test_cache_con_escrituras_concurrentes(self):
+        # Hilos que leen la lista mientras otro crea recetas: al terminar la lista guardada no puede quedar atrasada
+        # y cada llamado cuenta exactamente un acierto o un fallo:
+        def leer():
+            try:
+                for _ in range(50):
+                    self.logica.dar_recetas()
+                    self.logica.dar_ids_recetas()
+            finally:
+                self.logica.cerrar_sesion()
+
+        def escribir():
+            try:
+                for i in range(20):
+                    self.logica.crear_receta("Receta {:02d}".format(i), "00:10:00", 2, 100, "Mezclar todo")
+            finally:
+                self.logica.cerrar_sesion()
+
+        with ThreadPoolExecutor(max_workers=4) as hilos:
+            futuros = [hilos.submit(leer) for _ in range(3)] + [hilos.submit(escribir)]
+            for futuro in futuros:
+                futuro.result()
 
+        nombres = ["Receta {:02d}".format(i) for i in range(20)]
+        self.assertEqual([receta["nombre"] for receta in self.logica.dar_recetas()], nombres)
+        self.assertEqual(len(self.logica.dar_ids_recetas()), 20)
+        estadisticas = self.logica.dar_estadisticas_cache()
+        self.assertEqual(estadisticas['aciertos'] + estadisticas['fallos'], 3 * 50 + 1)
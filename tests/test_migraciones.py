@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from sqlalchemy import create_engine, inspect
+
+# Se importan los modelos para que sus tablas queden registradas en Base.metadata:
+import src.modelo.ingrediente
+import src.modelo.receta
+from src.modelo.migraciones import migrar_esquema
+from src.logica.LogicaRecetario import LogicaRecetario
+
+
+class MigracionesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # Base de datos con el esquema anterior (sin indices):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.motor = create_engine('sqlite:///' + os.path.join(self.directorio.name, 'anterior.sqlite'))
+        self.motor.execute("CREATE TABLE receta (id INTEGER PRIMARY KEY, nombre VARCHAR, tiempo VARCHAR, "
+                           "personas INTEGER, calorias FLOAT, preparacion VARCHAR)")
+        self.motor.execute("CREATE TABLE ingrediente (id INTEGER PRIMARY KEY, nombre VARCHAR, unidad VARCHAR, "
+                           "valor FLOAT, \"sitioCompra\" VARCHAR)")
+        self.motor.execute("CREATE TABLE ingrediente_receta (id INTEGER PRIMARY KEY, "
+                           "ingrediente_id INTEGER REFERENCES ingrediente (id), "
+                           "receta_id INTEGER REFERENCES receta (id), cantidad INTEGER)")
+
+    def tearDown(self):
+        self.motor.dispose()
+        self.directorio.cleanup()
+
+    def test_migrar_esquema_crea_indices(self):
+        pendientes = migrar_esquema(self.motor)
+
+        self.assertEqual(pendientes, [])
+        inspector = inspect(self.motor)
+        self.assertIn('ix_receta_nombre', [i['name'] for i in inspector.get_indexes('receta')])
+        self.assertIn('ix_ingrediente_nombre_unidad', [i['name'] for i in inspector.get_indexes('ingrediente')])
+        self.assertIn('ix_ingrediente_receta_receta',
+                      [i['name'] for i in inspector.get_indexes('ingrediente_receta')])
+
+        # Volver a migrar no debe fallar:
+        self.assertEqual(migrar_esquema(self.motor), [])
+
+    def test_migrar_esquema_con_datos_repetidos(self):
+        self.motor.execute("INSERT INTO receta (nombre) VALUES ('Ajiaco'), ('Ajiaco')")
+
+        pendientes = migrar_esquema(self.motor)
+
+        self.assertEqual(pendientes, ['ix_receta_nombre'])
+
+    def test_migrar_esquema_borra_indices_obsoletos(self):
+        self.motor.execute("CREATE INDEX ix_ingrediente_orden ON ingrediente (nombre, unidad, \"sitioCompra\")")
+
+        migrar_esquema(self.motor)
+
+        indices = [i['name'] for i in inspect(self.motor).get_indexes('ingrediente')]
+        self.assertNotIn('ix_ingrediente_orden', indices)
+        self.assertIn('ix_ingrediente_nombre_unidad', indices)
+
+    def test_logica_informa_indices_pendientes(self):
+        # La logica guarda y registra los indices unicos que la migracion no pudo crear:
+        with mock.patch('src.logica.LogicaRecetario.migrar_esquema', return_value=['ix_receta_nombre']):
+            with self.assertLogs('src.logica.LogicaRecetario', level='WARNING') as registros:
+                logica = LogicaRecetario()
+        self.assertEqual(logica.indices_pendientes, ['ix_receta_nombre'])
+        self.assertIn('ix_receta_nombre', registros.output[0])
+
+    def test_migrar_esquema_tiempo_en_segundos(self):
+        self.motor.execute("INSERT INTO receta (nombre, tiempo) VALUES ('Ajiaco', '01:30:15'), ('Arepa', '00:10:00')")
+
+        migrar_esquema(self.motor)
+
+        filas = self.motor.execute("SELECT nombre, tiempo_segundos FROM receta ORDER BY nombre").fetchall()
+        self.assertEqual([tuple(fila) for fila in filas], [('Ajiaco', 5415), ('Arepa', 600)])
+        self.assertIn('ix_receta_tiempo_segundos', [i['name'] for i in inspect(self.motor).get_indexes('receta')])
+
+    def test_migrar_esquema_costo_recetas(self):
+        self.motor.execute("INSERT INTO receta (id, nombre) VALUES (1, 'Ajiaco'), (2, 'Arepa')")
+        self.motor.execute("INSERT INTO ingrediente (id, nombre, unidad, valor) VALUES (1, 'Papa', 'kg', 500)")
+        self.motor.execute("INSERT INTO ingrediente_receta (ingrediente_id, receta_id, cantidad) VALUES (1, 1, 3)")
+
+        migrar_esquema(self.motor)
+
+        def costos():
+            return [tuple(fila) for fila in self.motor.execute("SELECT id, costo_base FROM receta ORDER BY id")]
+
+        self.assertEqual(costos(), [(1, 1500), (2, 0)])
+        # Los triggers mantienen el costo despues de la migracion:
+        self.motor.execute("INSERT INTO ingrediente_receta (ingrediente_id, receta_id, cantidad) VALUES (1, 2, 2)")
+        self.motor.execute("UPDATE ingrediente SET valor = 100 WHERE id = 1")
+        self.assertEqual(costos(), [(1, 300), (2, 200)])
+        self.motor.execute("DELETE FROM ingrediente_receta WHERE receta_id = 1")
+        self.assertEqual(costos(), [(1, 0), (2, 200)])
@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+
+from src.modelo.declarative_base import crear_motor
+
+
+class MotorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.url = 'sqlite:///' + os.path.join(self.directorio.name, 'perfil.sqlite')
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def test_crear_motor_perfil_escritura(self):
+        motor = crear_motor(self.url, 'escritura')
+        with motor.connect() as conexion:
+            self.assertEqual(conexion.execute('PRAGMA journal_mode').scalar(), 'wal')
+            # synchronous=NORMAL equivale a 1:
+            self.assertEqual(conexion.execute('PRAGMA synchronous').scalar(), 1)
+            self.assertEqual(conexion.execute('PRAGMA foreign_keys').scalar(), 1)
+        motor.dispose()
+
+    def test_crear_motor_desactivar_claves_foraneas(self):
+        motor = crear_motor(self.url, 'lectura', claves_foraneas=False)
+        with motor.connect() as conexion:
+            self.assertEqual(conexion.execute('PRAGMA foreign_keys').scalar(), 0)
+            self.assertEqual(conexion.execute('PRAGMA mmap_size').scalar(), 268435456)
+        motor.dispose()
+
+    def test_crear_motor_perfil_personalizado(self):
+        motor = crear_motor(self.url, {'cache_size': -2000})
+        with motor.connect() as conexion:
+            self.assertEqual(conexion.execute('PRAGMA cache_size').scalar(), -2000)
+        motor.dispose()
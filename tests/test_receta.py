@@ -1,11 +1,15 @@
+import io
+import json
+import tempfile
 import unittest
 import math
 import os
 from faker import Faker
 import random
 from src.modelo.receta import Receta
-from src.modelo.ingrediente import Ingrediente
-from src.modelo.declarative_base import Session, Base
+from src.modelo.ingrediente import Ingrediente, IngredienteReceta
+
+from src.modelo.declarative_base import Session, Base, contar_sentencias, session
 from src.logica.LogicaRecetario import LogicaRecetario
 
 
@@ -331,9 +335,8 @@ class RecetaTestCase(unittest.TestCase):
         nombres_recetas = [receta["nombre"] for receta in recetas]
         self.assertIn(nombre, nombres_recetas)
 
-        # ID de la receta creada:
-        receta_bd = self.session.query(Receta).filter_by(nombre=nombre).first()
-        id_receta = receta_bd.id
+        # Posicion de la receta creada en la lista:
+        id_receta = nombres_recetas.index(nombre)
 
         # Ahora se edita la receta:
         nombre_nuevo_receta = self.data_factory.unique.word()
@@ -786,10 +789,426 @@ class RecetaTestCase(unittest.TestCase):
 
         self.assertEqual(preparacion_test, preparacion_logica)
 
+    def test_dar_receta_por_id(self):
+        nombre_receta = self.data_factory.unique.word()
+        tiempo = "0" + str(self.data_factory.random_number(digits=1)) + ":0" + str(
+            self.data_factory.random_number(digits=1)) + ":0" + str(self.data_factory.random_number(digits=1))
+        personas = self.data_factory.random_digit_not_null()
+        calorias = round(random.uniform(1, 1000), 2)
+        preparacion = self.data_factory.text()
+        self.LogicaRecetario.crear_receta(nombre_receta, tiempo, personas, calorias, preparacion)
 
+        receta = self.session.query(Receta).filter(Receta.nombre == nombre_receta).first()
 
+        self.assertEqual(self.LogicaRecetario.dar_receta_por_id(receta.id)['nombre'], nombre_receta)
+        self.assertIsNone(self.LogicaRecetario.dar_receta_por_id(receta.id + 1))
+
+    def test_dar_recetas_por_tiempo(self):
+        self.LogicaRecetario.crear_receta("Ajiaco", "01:30:00", 4, 250, self.data_factory.sentence())
+        self.LogicaRecetario.crear_receta("Arepa", "00:20:00", 2, 150, self.data_factory.sentence())
+        self.LogicaRecetario.crear_receta("Chocolate", "00:10:30", 2, 120, self.data_factory.sentence())
+
+        recetas = self.LogicaRecetario.dar_recetas_por_tiempo("00:30:00")
+
+        self.assertEqual([receta["nombre"] for receta in recetas], ["Chocolate", "Arepa"])
+        self.assertEqual(recetas[0]["tiempo"], "00:10:30")
+        receta = self.session.query(Receta).filter(Receta.nombre == "Arepa").first()
+        self.assertEqual(receta.tiempo_segundos, 1200)
+
+    def test_dar_recetas_por_tiempo_formato_incorrecto(self):
+        for tiempo_maximo in ["30 min", "00:30", "", None]:
+            with self.assertRaises(ValueError):
+                self.LogicaRecetario.dar_recetas_por_tiempo(tiempo_maximo)
+
+    def test_dar_recetas_por_costo(self):
+        self.LogicaRecetario.crear_receta("Ajiaco", "01:30:00", 4, 250, self.data_factory.sentence())
+        self.LogicaRecetario.crear_receta("Arepa", "00:20:00", 2, 150, self.data_factory.sentence())
+        self.LogicaRecetario.crear_receta("Chocolate", "00:10:30", 2, 120, self.data_factory.sentence())
+        self.LogicaRecetario.crear_ingrediente("Arroz", "kg", 1000, "Tienda")
+        self.LogicaRecetario.crear_ingrediente("Papa", "kg", 500, "Plaza")
+        arroz, papa = self.LogicaRecetario.dar_ingredientes()
+        self.LogicaRecetario.agregar_ingrediente_receta({"nombre": "Ajiaco"}, papa, 6)
+        self.LogicaRecetario.agregar_ingrediente_receta({"nombre": "Arepa"}, arroz, 2)
+        self.LogicaRecetario.agregar_ingrediente_receta({"nombre": "Arepa"}, papa, 1)
+
+        recetas = self.LogicaRecetario.dar_recetas_por_costo(descendente=True)
+        self.assertEqual([(receta["nombre"], receta["costo_base"]) for receta in recetas],
+                         [("Ajiaco", 3000), ("Arepa", 2500), ("Chocolate", 0)])
+
+        # El costo se actualiza cuando cambia el valor de un ingrediente:
+        self.LogicaRecetario.editar_ingrediente(1, "Papa", "kg", 200, "Plaza")
+        recetas = self.LogicaRecetario.dar_recetas_por_costo(limite=2)
+        self.assertEqual([(receta["nombre"], receta["costo_base"]) for receta in recetas],
+                         [("Chocolate", 0), ("Ajiaco", 1200)])
+        self.assertEqual(self.LogicaRecetario.dar_preparacion(0, 4)["costo"], 1200)
+
+    def test_validar_receta_repetida_sin_cargar_recetas(self):
+        self.LogicaRecetario.crear_receta("Ajiaco", "01:30:00", 4, 250, self.data_factory.sentence())
+        self.LogicaRecetario.crear_receta("Arepa", "00:20:00", 2, 150, self.data_factory.sentence())
+        self.LogicaRecetario.dar_id_receta(0)
+
+        with contar_sentencias() as sentencias:
+            # Editar la receta con su mismo nombre no es repetir el nombre:
+            misma = self.LogicaRecetario.validar_crear_editar_receta(
+                1, "Arepa", "00:30:00", 2, 150, "Asar", self.LogicaRecetario.EVENTO_EDITAR_RECETA)
+            otra = self.LogicaRecetario.validar_crear_editar_receta(
+                1, "Ajiaco", "00:30:00", 2, 150, "Asar", self.LogicaRecetario.EVENTO_EDITAR_RECETA)
+
+        self.assertEqual(misma, "")
+        self.assertEqual(otra, "Ya existe una receta con el nombre 'Ajiaco'")
+        # Una consulta por validacion, sin volver a cargar la lista de recetas:
+        self.assertEqual(len(sentencias), 2)
+
+        # guardar_receta retorna el mensaje de la validacion y solo guarda si no hay error:
+        self.assertEqual(self.LogicaRecetario.guardar_receta(1, "Arepa", "00:30:00", 2, 150, "1234"),
+                         "La preparacion de la receta debe ser un valor de cadena de caracteres")
+        self.assertEqual(self.LogicaRecetario.guardar_receta(1, "Arepa", "00:30:00", 2, 150, "Asar"), "")
+        self.assertEqual(self.LogicaRecetario.dar_receta(1)["tiempo"], "00:30:00")
+
+    def test_eliminar_receta(self):
+        self.LogicaRecetario.crear_receta("Ajiaco", "01:30:00", 4, 250, self.data_factory.sentence())
+        self.LogicaRecetario.crear_receta("Arepa", "00:20:00", 2, 150, self.data_factory.sentence())
+        self.LogicaRecetario.crear_ingrediente("Papa", "kg", 2000, "Plaza")
+        self.LogicaRecetario.crear_ingrediente("Queso", "lb", 8000, "Tienda")
+        for receta in self.LogicaRecetario.dar_recetas():
+            for ingrediente in self.LogicaRecetario.dar_ingredientes():
+                self.LogicaRecetario.agregar_ingrediente_receta(receta, ingrediente, 1)
+        self.LogicaRecetario.dar_id_receta(0)
+
+        # Una posicion fuera de la lista no borra ninguna receta:
+        recetas = self.LogicaRecetario.dar_recetas()
+        self.assertFalse(self.LogicaRecetario.eliminar_receta(len(recetas)))
+        self.assertFalse(self.LogicaRecetario.eliminar_receta(-1))
+        self.assertFalse(self.LogicaRecetario.editar_receta(len(recetas), "Sopa", "00:30:00", 3, 180, "Hervir"))
+        self.assertEqual(self.session.query(Receta).count(), 2)
+
+        # Los ingredientes de la receta y la receta se borran con un DELETE por tabla, sin consultas:
+        with contar_sentencias() as sentencias:
+            self.assertTrue(self.LogicaRecetario.eliminar_receta(0))
+        self.assertEqual([sentencia.split()[0] for sentencia in sentencias], ["DELETE", "DELETE"])
+
+        self.assertEqual([receta['nombre'] for receta in self.LogicaRecetario.dar_recetas()], ["Arepa"])
+        arepa = self.session.query(Receta).filter(Receta.nombre == "Arepa").one()
+        self.assertEqual({fila.receta_id for fila in self.session.query(IngredienteReceta)}, {arepa.id})
+        self.assertEqual(self.session.query(Ingrediente).count(), 2)
+        self.assertEqual(self.LogicaRecetario.buscar_recetas("Ajiaco"), [])
+
+        self.assertTrue(self.LogicaRecetario.eliminar_receta(0))
+        self.assertEqual(self.session.query(IngredienteReceta).count(), 0)
+        self.assertFalse(self.LogicaRecetario.eliminar_receta(0))
+
+    def test_eliminar_receta_sesion(self):
+        # Borrar la receta desde el ORM tambien borra sus filas de ingrediente_receta, aunque SQLite no tenga las
+        # claves foraneas activas:
+        self.LogicaRecetario.crear_receta("Ajiaco", "01:30:00", 4, 250, self.data_factory.sentence())
+        self.LogicaRecetario.crear_ingrediente("Papa", "kg", 2000, "Plaza")
+        self.LogicaRecetario.agregar_ingrediente_receta(self.LogicaRecetario.dar_receta(0),
+                                                        self.LogicaRecetario.dar_ingrediente(0), 1)
+        self.session.delete(self.session.query(Receta).one())
+        self.session.commit()
+        self.assertEqual(self.session.query(IngredienteReceta).count(), 0)
+
+    def test_editar_receta_una_sentencia(self):
+        self.LogicaRecetario.crear_receta("Ajiaco", "01:30:00", 4, 250, self.data_factory.sentence())
+        self.LogicaRecetario.crear_receta("Arepa", "00:20:00", 2, 150, self.data_factory.sentence())
+        self.LogicaRecetario.dar_id_receta(0)
+
+        with contar_sentencias() as sentencias:
+            editada = self.LogicaRecetario.editar_receta(1, "Arepa de queso", "00:30:00", 3, 180, "Asar")
+        # La validacion del nombre y la edicion son un solo UPDATE por id:
+        self.assertTrue(editada)
+        self.assertEqual(len(sentencias), 1)
+        self.assertTrue(sentencias[0].startswith("UPDATE receta"))
+
+        receta = self.session.query(Receta).filter(Receta.nombre == "Arepa de queso").one()
+        self.assertEqual((receta.tiempo, receta.personas, receta.calorias), ("00:30:00", 3, 180))
+
+        # guardar_receta, que usa la interfaz, edita con el mismo UPDATE:
+        self.LogicaRecetario.dar_id_receta(0)
+        with contar_sentencias() as sentencias:
+            self.assertEqual(self.LogicaRecetario.guardar_receta(1, "Arepa de queso", "00:40:00", 3, 180, "Asar"), "")
+        self.assertEqual(len(sentencias), 1)
+
+        # Con el nombre de otra receta no se modifica nada y solo entonces se consulta la causa para el mensaje:
+        self.LogicaRecetario.dar_id_receta(0)
+        with contar_sentencias() as sentencias:
+            self.assertEqual(self.LogicaRecetario.guardar_receta(1, "Ajiaco", "00:30:00", 3, 180, "Asar"),
+                             "Ya existe una receta con el nombre 'Ajiaco'")
+        self.assertEqual([sentencia.split()[0] for sentencia in sentencias], ["UPDATE", "SELECT"])
+        self.assertEqual(self.session.query(Receta).filter(Receta.nombre == "Ajiaco").count(), 1)
+
+        # Los mensajes siguen el orden de validar_crear_editar_receta: el nombre repetido va antes que la preparacion
+        for tiempo, preparacion in [("00:30:00", ""), ("00:30:00", "1234"), ("30 min", "Asar")]:
+            self.assertEqual(self.LogicaRecetario.guardar_receta(1, "Ajiaco", tiempo, 3, 180, preparacion),
+                             self.LogicaRecetario.validar_crear_editar_receta(
+                                 1, "Ajiaco", tiempo, 3, 180, preparacion, self.LogicaRecetario.EVENTO_EDITAR_RECETA))
+        self.assertEqual(self.LogicaRecetario.guardar_receta(1, "Ajiaco", "00:30:00", 3, 180, ""),
+                         "Ya existe una receta con el nombre 'Ajiaco'")
+        self.assertFalse(self.LogicaRecetario.editar_receta(5, "Sopa", "00:30:00", 3, 180, "Hervir"))
+
+    def test_dar_id_receta_sigue_orden_de_recetas(self):
+        nombres = sorted([self.data_factory.unique.word() for i in range(3)], reverse=True)
+        for nombre in nombres:
+            self.LogicaRecetario.crear_receta(nombre, "00:10:00", 2, 100, self.data_factory.sentence())
 
-
-
-
-
+        recetas = self.LogicaRecetario.dar_recetas()
+        for i in range(len(recetas)):
+            self.assertEqual(self.LogicaRecetario.dar_id_receta(i), recetas[i]["id"])
+            self.assertEqual(self.LogicaRecetario.dar_receta(i)["nombre"], recetas[i]["nombre"])
+
+        # Al crear una receta nueva el mapa de posiciones se debe actualizar:
+        self.LogicaRecetario.crear_receta("A" + nombres[-1], "00:10:00", 2, 100, self.data_factory.sentence())
+        self.assertEqual(self.LogicaRecetario.dar_receta(0)["nombre"], "A" + nombres[-1])
+
+    def test_preparar_receta_numero_consultas_constante(self):
+        self.LogicaRecetario.crear_receta(self.data_factory.unique.word(), "01:30:00", 4, 250,
+                                          self.data_factory.sentence())
+        receta = self.session.query(Receta).order_by(Receta.id.desc()).first()
+
+        for i in range(30):
+            self.LogicaRecetario.crear_ingrediente(self.data_factory.unique.word(), self.data_factory.unique.word(),
+                                                   self.data_factory.pyfloat(min_value=1, max_value=1000),
+                                                   self.data_factory.city())
+            ingrediente = self.session.query(Ingrediente).order_by(Ingrediente.id.desc()).first()
+            self.LogicaRecetario.agregar_ingrediente_receta(receta.__dict__, ingrediente.__dict__,
+                                                            random.randint(1, 100))
+
+        with contar_sentencias() as sentencias:
+            preparacion = self.LogicaRecetario.dar_preparacion(0, 200)
+
+        self.assertEqual(len(preparacion["datos_ingredientes"]), 30)
+        self.assertEqual(preparacion["costo"], sum(ing["valor"] for ing in preparacion["datos_ingredientes"]))
+        # Mapa de posiciones de recetas + receta por id + ingredientes con su cantidad:
+        self.assertLessEqual(len(sentencias), 3)
+
+    def test_dar_recetas_registros_de_solo_lectura(self):
+        nombre_receta = self.data_factory.unique.word()
+        self.LogicaRecetario.crear_receta(nombre_receta, "00:45:00", 3, 120, self.data_factory.sentence())
+
+        receta = self.LogicaRecetario.dar_recetas()[0]
+
+        self.assertEqual(receta["nombre"], nombre_receta)
+        self.assertEqual(receta.nombre, nombre_receta)
+        self.assertNotIn("_sa_instance_state", receta.keys())
+        with self.assertRaises(AttributeError):
+            receta.nombre = self.data_factory.unique.word()
+        with self.assertRaises(TypeError):
+            receta["nombre"] = self.data_factory.unique.word()
+
+    def test_dar_recetas_pagina(self):
+        for i in range(7):
+            self.LogicaRecetario.crear_receta(self.data_factory.unique.word(), "00:20:00", 2, 300,
+                                              self.data_factory.sentence())
+
+        paginas = []
+        pagina, cursor = self.LogicaRecetario.dar_recetas_pagina(3)
+        paginas.append(pagina)
+        while cursor is not None:
+            pagina, cursor = self.LogicaRecetario.dar_recetas_pagina(3, cursor)
+            paginas.append(pagina)
+
+        self.assertEqual([len(pagina) for pagina in paginas], [3, 3, 1])
+        recetas_paginadas = [receta for pagina in paginas for receta in pagina]
+        self.assertEqual(recetas_paginadas, self.LogicaRecetario.dar_recetas())
+
+    def test_dar_recetas_pagina_tamano_invalido(self):
+        for tamano_pagina in [0, -1]:
+            with self.assertRaises(ValueError):
+                self.LogicaRecetario.dar_recetas_pagina(tamano_pagina)
+
+    def test_importar_recetas_csv(self):
+        nombre_1 = self.data_factory.unique.word()
+        nombre_2 = self.data_factory.unique.word()
+        archivo = io.StringIO(
+            "nombre,tiempo,personas,calorias,preparacion\n"
+            f"{nombre_1},00:40:00,4,350,Cocinar a fuego lento\n"
+            f"{nombre_2},1 hora,4,350,Hornear\n"
+            f"{nombre_1},00:20:00,2,150,Otra vez\n")
+
+        resumen = self.LogicaRecetario.importar_recetas_csv(archivo)
+
+        self.assertEqual(resumen["importados"], 1)
+        self.assertEqual(resumen["rechazados"],
+                         [{"linea": 3, "mensaje": "El tiempo de la receta no tiene el formato correcto"},
+                          {"linea": 4, "mensaje": f"Ya existe una receta con el nombre '{nombre_1}'"}])
+        receta = self.LogicaRecetario.dar_receta(0)
+        self.assertEqual(receta["nombre"], nombre_1)
+        self.assertEqual(receta["personas"], 4)
+
+    def test_importar_recetas_csv_con_perfil(self):
+        # Las importaciones y las listas usan cada una el motor de su perfil; el resto de la logica, el del modulo:
+        logica = LogicaRecetario(perfiles={'importar': {'synchronous': 'OFF'}, 'listar': {'cache_size': -8000}})
+        try:
+            with logica.usar_perfil('importar'):
+                self.assertEqual(session.execute('PRAGMA synchronous').scalar(), 0)
+                # Dentro de la importacion las listas siguen en la misma sesion:
+                with logica.usar_perfil('listar'):
+                    self.assertEqual(session.execute('PRAGMA synchronous').scalar(), 0)
+            with logica.usar_perfil('listar'):
+                self.assertEqual(session.execute('PRAGMA cache_size').scalar(), -8000)
+            self.assertEqual(session.execute('PRAGMA synchronous').scalar(), 2)
+            self.assertNotEqual(session.execute('PRAGMA cache_size').scalar(), -8000)
+
+            archivo = io.StringIO("nombre,tiempo,personas,calorias,preparacion\n"
+                                  "Ajiaco,01:30:00,4,250,Cocinar las papas\n"
+                                  "Arepa,00:20:00,2,150,Asar la masa\n")
+            self.assertEqual(logica.importar_recetas_csv(archivo)["importados"], 2)
+            self.assertEqual([receta["nombre"] for receta in logica.dar_recetas()], ["Ajiaco", "Arepa"])
+            self.assertEqual(logica.dar_receta(1)["tiempo"], "00:20:00")
+        finally:
+            logica.cerrar_sesion()
+            logica.cerrar_motores()
+
+    def test_validar_recetas(self):
+        self.LogicaRecetario.crear_receta("Ajiaco", "01:30:00", 4, 250, self.data_factory.sentence())
+        self.LogicaRecetario.crear_receta("Arepa", "00:20:00", 2, 150, self.data_factory.sentence())
+        recetas = [{"nombre": "Sancocho", "tiempo": "02:00:00", "personas": 6, "calorias": 400, "preparacion": "Hervir"},
+                   {"nombre": "Ajiaco", "tiempo": "01:00:00", "personas": 4, "calorias": 250, "preparacion": "Hervir"},
+                   {"nombre": "Sancocho", "tiempo": "02:00:00", "personas": 6, "calorias": 400, "preparacion": "Hervir"},
+                   {"nombre": "Tamal", "tiempo": "2 horas", "personas": 6, "calorias": 400, "preparacion": "Envolver"},
+                   {"nombre": "Tamal", "tiempo": "02:00:00", "personas": "seis", "calorias": 400, "preparacion": ""},
+                   {"id_receta": 0, "nombre": "Ajiaco", "tiempo": "01:00:00", "personas": 4, "calorias": 250,
+                    "preparacion": "Hervir"},
+                   {"id_receta": 0, "nombre": "Arepa", "tiempo": "01:00:00", "personas": 4, "calorias": 250,
+                    "preparacion": "Hervir"}]
+
+        mensajes = self.LogicaRecetario.validar_recetas(recetas)
+
+        self.assertEqual(mensajes, ["", "Ya existe una receta con el nombre 'Ajiaco'",
+                                    "Ya existe una receta con el nombre 'Sancocho'",
+                                    "El tiempo de la receta no tiene el formato correcto",
+                                    "El número de personas debe ser un valor numérico", "",
+                                    "Ya existe una receta con el nombre 'Arepa'"])
+        # Sin repeticiones dentro del lote, los mensajes son los de validar_crear_editar_receta:
+        for receta, mensaje in zip(recetas[1:], mensajes[1:]):
+            if receta["nombre"] != "Sancocho":
+                id_receta = receta.get("id_receta", -1)
+                modo = self.LogicaRecetario.EVENTO_AGREGAR_RECETA if id_receta == -1 else \
+                    self.LogicaRecetario.EVENTO_EDITAR_RECETA
+                self.assertEqual(self.LogicaRecetario.validar_crear_editar_receta(
+                    id_receta, receta["nombre"], receta["tiempo"], receta["personas"], receta["calorias"],
+                    receta["preparacion"], modo), mensaje)
+
+    def test_exportar_catalogo(self):
+        nombre_receta = self.data_factory.unique.word()
+        self.LogicaRecetario.crear_receta(nombre_receta, "00:40:00", 4, 350, self.data_factory.sentence())
+        self.LogicaRecetario.crear_receta(self.data_factory.unique.word(), "00:10:00", 1, 90,
+                                          self.data_factory.sentence())
+        receta = self.session.query(Receta).filter(Receta.nombre == nombre_receta).first()
+        nombre_ingrediente = self.data_factory.unique.word()
+        self.LogicaRecetario.crear_ingrediente(nombre_ingrediente, "kg", 3000, "Plaza")
+        ingrediente = self.session.query(Ingrediente).filter(Ingrediente.nombre == nombre_ingrediente).first()
+        self.LogicaRecetario.agregar_ingrediente_receta(receta.__dict__, ingrediente.__dict__, 2)
+
+        with tempfile.TemporaryDirectory() as directorio:
+            conteo = self.LogicaRecetario.exportar_catalogo(directorio, "csv", tamano_lote=1)
+            self.assertEqual(conteo, {"recetas": 2, "ingredientes": 1, "ingredientes_receta": 1})
+            with open(os.path.join(directorio, "ingredientes_receta.csv"), encoding="utf-8") as archivo:
+                lineas = archivo.read().splitlines()
+            self.assertEqual(lineas[1], f"{receta.id},{nombre_receta},{ingrediente.id},{nombre_ingrediente},kg,2")
+
+            conteo = self.LogicaRecetario.exportar_catalogo(directorio, "jsonl")
+            self.assertEqual(conteo, {"recetas": 2, "ingredientes": 1})
+            with open(os.path.join(directorio, "recetas.jsonl"), encoding="utf-8") as archivo:
+                recetas = [json.loads(linea) for linea in archivo]
+            receta_exportada = next(r for r in recetas if r["nombre"] == nombre_receta)
+            self.assertEqual(receta_exportada["ingredientes"],
+                             [{"ingrediente": nombre_ingrediente, "unidad": "kg", "cantidad": 2}])
+            self.assertEqual(sum(len(r["ingredientes"]) for r in recetas), 1)
+
+    def test_preparar_receta_memorizada(self):
+        nombre_receta = self.data_factory.unique.word()
+        self.LogicaRecetario.crear_receta(nombre_receta, "01:00:00", 4, 500, self.data_factory.sentence())
+        receta = self.session.query(Receta).filter(Receta.nombre == nombre_receta).first()
+        nombre_ingrediente = self.data_factory.unique.word()
+        self.LogicaRecetario.crear_ingrediente(nombre_ingrediente, "kg", 1000, "Plaza")
+        ingrediente = self.session.query(Ingrediente).filter(Ingrediente.nombre == nombre_ingrediente).first()
+        self.LogicaRecetario.agregar_ingrediente_receta(receta.__dict__, ingrediente.__dict__, 3)
+
+        preparacion = self.LogicaRecetario.dar_preparacion(0, 10)
+        self.assertEqual(preparacion["costo"], 8000)
+        # Modificar el resultado no debe afectar los siguientes llamados:
+        preparacion["costo"] = 0
+
+        with contar_sentencias() as sentencias:
+            preparacion = self.LogicaRecetario.dar_preparacion(0, 10)
+        self.assertEqual(preparacion["costo"], 8000)
+        self.assertEqual(sentencias, [])
+
+        # Cambiar el valor del ingrediente debe invalidar la preparacion guardada:
+        self.LogicaRecetario.editar_ingrediente(0, nombre_ingrediente, "kg", 2000, "Plaza")
+        self.assertEqual(self.LogicaRecetario.dar_preparacion(0, 10)["costo"], 16000)
+
+    def test_dar_preparaciones_igual_a_dar_preparacion(self):
+        nombre_receta = self.data_factory.unique.word()
+        tiempo = "0" + str(self.data_factory.random_number(digits=1)) + ":" + str(
+            random.randint(10, 59)) + ":" + str(random.randint(10, 59))
+        personas = random.randint(2, 9)
+        self.LogicaRecetario.crear_receta(nombre_receta, tiempo, personas, round(random.uniform(1, 1000), 2),
+                                          self.data_factory.sentence())
+        receta = self.session.query(Receta).filter(Receta.nombre == nombre_receta).first()
+        for i in range(5):
+            nombre_ingrediente = self.data_factory.unique.word()
+            self.LogicaRecetario.crear_ingrediente(nombre_ingrediente, self.data_factory.unique.word(),
+                                                   self.data_factory.pyfloat(min_value=1, max_value=1000),
+                                                   self.data_factory.city())
+            ingrediente = self.session.query(Ingrediente).filter(Ingrediente.nombre == nombre_ingrediente).first()
+            self.LogicaRecetario.agregar_ingrediente_receta(receta.__dict__, ingrediente.__dict__,
+                                                            random.randint(1, 100))
+
+        cantidades_personas = list(range(1, 101))
+        preparaciones = self.LogicaRecetario.dar_preparaciones(0, cantidades_personas)
+
+        self.assertEqual(len(preparaciones), len(cantidades_personas))
+        for cantidad_personas, preparacion in zip(cantidades_personas, preparaciones):
+            self.assertEqual(preparacion, self.LogicaRecetario.dar_preparacion(0, cantidad_personas))
+
+    def test_dar_lista_compras(self):
+        self.LogicaRecetario.crear_receta("Ajiaco", "01:00:00", 4, 500, "Cocinar las papas")
+        self.LogicaRecetario.crear_receta("Sudado", "00:45:00", 2, 400, "Guisar la carne")
+        ajiaco = self.session.query(Receta).filter(Receta.nombre == "Ajiaco").first()
+        sudado = self.session.query(Receta).filter(Receta.nombre == "Sudado").first()
+        self.LogicaRecetario.crear_ingrediente("Papa", "kg", 2000, "Plaza")
+        self.LogicaRecetario.crear_ingrediente("Pollo", "kg", 12000, "Supermercado")
+        self.LogicaRecetario.crear_ingrediente("Carne", "kg", 20000, "Supermercado")
+        papa = self.session.query(Ingrediente).filter(Ingrediente.nombre == "Papa").first()
+        pollo = self.session.query(Ingrediente).filter(Ingrediente.nombre == "Pollo").first()
+        carne = self.session.query(Ingrediente).filter(Ingrediente.nombre == "Carne").first()
+        self.LogicaRecetario.agregar_ingrediente_receta(ajiaco.__dict__, papa.__dict__, 2)
+        self.LogicaRecetario.agregar_ingrediente_receta(ajiaco.__dict__, pollo.__dict__, 1)
+        self.LogicaRecetario.agregar_ingrediente_receta(sudado.__dict__, papa.__dict__, 1)
+        self.LogicaRecetario.agregar_ingrediente_receta(sudado.__dict__, carne.__dict__, 1)
+
+        # Ajiaco es la receta 0 y Sudado la 1 en la lista ordenada. Papa: ceil(2 * 10 / 4) + ceil(1 * 3 / 2) = 7:
+        lista_compras = self.LogicaRecetario.dar_lista_compras([(0, 10), (1, 3)])
+
+        self.assertEqual(lista_compras, [
+            {"sitioCompra": "Plaza", "costo": 14000,
+             "ingredientes": [{"nombre": "Papa", "unidad": "kg", "cantidad": 7, "valor": 14000}]},
+            {"sitioCompra": "Supermercado", "costo": 76000,
+             "ingredientes": [{"nombre": "Carne", "unidad": "kg", "cantidad": 2, "valor": 40000},
+                              {"nombre": "Pollo", "unidad": "kg", "cantidad": 3, "valor": 36000}]}])
+
+        # Un menu vacio no consulta la base:
+        with contar_sentencias() as sentencias:
+            self.assertEqual(self.LogicaRecetario.dar_lista_compras([]), [])
+        self.assertEqual(sentencias, [])
+
+    def test_buscar_recetas(self):
+        self.LogicaRecetario.crear_receta("Ajiaco santafereño", "01:00:00", 4, 500,
+                                          "Cocinar las papas con el pollo y las guascas")
+        self.LogicaRecetario.crear_receta("Sudado de pollo", "00:45:00", 2, 400, "Guisar el pollo con tomate")
+        self.LogicaRecetario.crear_receta("Arepa", "00:20:00", 2, 200, "Asar la masa de maiz")
+
+        self.assertEqual([receta["nombre"] for receta in self.LogicaRecetario.buscar_recetas("pollo")],
+                         ["Sudado de pollo", "Ajiaco santafereño"])
+        # Sin tildes y por prefijo:
+        self.assertEqual([receta["nombre"] for receta in self.LogicaRecetario.buscar_recetas("santaf")],
+                         ["Ajiaco santafereño"])
+        self.assertEqual(self.LogicaRecetario.buscar_recetas('maiz "'), [self.LogicaRecetario.dar_receta(1)])
+
+        # El indice se actualiza al editar la receta:
+        self.LogicaRecetario.editar_receta(1, "Arepa de choclo", "00:20:00", 2, 200, "Asar la masa de choclo")
+        self.assertEqual(self.LogicaRecetario.buscar_recetas("maiz"), [])
+        self.assertEqual([receta["nombre"] for receta in self.LogicaRecetario.buscar_recetas("choclo")],
+                         ["Arepa de choclo"])